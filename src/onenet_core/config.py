@@ -4,3 +4,68 @@ SESSION_TTL_SECONDS = 3600 * 24 * 7  # 7 days
 
 # Database URL from environment (no hardcoding)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+
+# Engine / pool settings used by database.create_db_engine (pool sizes do
+# not apply to SQLite; a statement timeout of 0 disables it)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+# Process-local cache of the GET /roles payload (0 disables it)
+ROLE_CATALOG_CACHE_SECONDS = int(os.getenv("ROLE_CATALOG_CACHE_SECONDS", "30"))
+
+# Optional read replica for read-only endpoints (empty disables routing).
+# After a write, that session cookie reads from the primary for this long.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Package log level and output format, used by logger.setup_logging()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_JSON = os.getenv("LOG_JSON", "true").lower() in ("1", "true", "yes")
+
+# Request-path log sampling: per-route / per-error-code rates such as
+# "/auth/me=0.1,AUTH-002=0.05", a token bucket per identical error
+# (rate 0 disables it) and how often suppressed counts are summarized
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_ERROR_BURST = int(os.getenv("LOG_ERROR_BURST", "20"))
+LOG_ERROR_RATE_PER_SECOND = float(os.getenv("LOG_ERROR_RATE_PER_SECOND", "1"))
+LOG_SUPPRESSION_SUMMARY_SECONDS = int(os.getenv("LOG_SUPPRESSION_SUMMARY_SECONDS", "60"))
+
+# In-process cache of resolved sessions (set max entries to 0 to disable)
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+
+# Background deletion of expired sessions (set the interval to 0 to disable)
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "300"))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "1000"))
+
+# Session store: "db" keeps opaque session ids in the sessions table,
+# "memory" in process memory, "kv" in a key-value store (local stand-in
+# unless one is installed with utils.session_store.set_session_store),
+# "token" issues HMAC-signed stateless tokens checked against a revocation list
+SESSION_MODE = os.getenv("SESSION_MODE", "db")
+SESSION_TOKEN_SECRET = os.getenv("SESSION_TOKEN_SECRET", "")
+SESSION_REVOCATION_REFRESH_SECONDS = int(os.getenv("SESSION_REVOCATION_REFRESH_SECONDS", "5"))
+# Revocations committed up to this long after their revoked_at are still picked up
+SESSION_REVOCATION_LOOKBACK_SECONDS = int(os.getenv("SESSION_REVOCATION_LOOKBACK_SECONDS", "300"))
+
+# Write-behind buffer for last_login / session last_seen updates
+WRITE_BEHIND_FLUSH_INTERVAL_SECONDS = int(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_SECONDS", "5"))
+WRITE_BEHIND_FLUSH_THRESHOLD = int(os.getenv("WRITE_BEHIND_FLUSH_THRESHOLD", "1000"))
+WRITE_BEHIND_MAX_ENTRIES = int(os.getenv("WRITE_BEHIND_MAX_ENTRIES", "100000"))
+
+# Per-request SQL statement accounting: X-DB-Statements / Server-Timing
+# headers, log fields, and a warning when one statement shape repeats at
+# least the threshold number of times in a request (suspected N+1)
+SQL_ACCOUNTING = os.getenv("SQL_ACCOUNTING", "false").lower() in ("1", "true", "yes")
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+# Users directory search backend: "ilike" scans with ILIKE, "auto"
+# installs pg_trgm indexes (Postgres) or an FTS5 trigram table (SQLite)
+# at startup and falls back to ILIKE if that fails
+SEARCH_INDEX = os.getenv("SEARCH_INDEX", "ilike")
@@ -1,10 +1,313 @@
-from sqlalchemy.orm import declarative_base
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+from fastapi import Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+from .config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_SECONDS, DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+    DATABASE_REPLICA_URL, READ_YOUR_WRITES_SECONDS,
+)
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession
+except ImportError:  # greenlet is missing: only the sync path is available
+    AsyncSession = None
 
 # The ORM Base for models to inherit from
 Base = declarative_base()
 
-# A "Stub" dependency. 
-# It performs NO logic and has NO config.
-# It exists ONLY for routers to import it as: Depends(get_db)
+# Sessions for the default get_db; bound to the engine by configure_database
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+# Sessions for get_read_db; bound by configure_replica
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, info={"replica": True})
+
+_engine: Optional[Engine] = None
+_replica_engine: Optional[Engine] = None
+_replica_loaded = False
+_engine_lock = threading.Lock()
+
+
+def create_db_engine(url: str = DATABASE_URL, **engine_options) -> Engine:
+    """
+    Build an engine with the package's pool and connection settings.
+
+    Server databases get a QueuePool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW
+    with pre-ping and recycling; Postgres connections also get
+    DB_STATEMENT_TIMEOUT_MS as statement_timeout. SQLite connections get
+    the SQLITE_JOURNAL_MODE and SQLITE_SYNCHRONOUS pragmas, and in-memory
+    databases share a single connection. engine_options override any of it.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options: Dict[str, Any] = {"pool_pre_ping": DB_POOL_PRE_PING}
+    connect_args: Dict[str, Any] = {}
+
+    if backend == "sqlite":
+        connect_args["check_same_thread"] = False
+        if parsed.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        )
+        if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    options["connect_args"] = {**connect_args, **engine_options.pop("connect_args", {})}
+    options.update(engine_options)
+    engine = create_engine(url, **options)
+
+    if backend == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            if SQLITE_JOURNAL_MODE:
+                cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            if SQLITE_SYNCHRONOUS:
+                cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            cursor.close()
+
+    return engine
+
+
+def configure_database(url: str = DATABASE_URL, **engine_options) -> Engine:
+    """Create the engine behind SessionLocal and the default get_db, replacing any previous one"""
+    engine = create_db_engine(url, **engine_options)
+    with _engine_lock:
+        previous = _engine
+        _set_engine(engine)
+    if previous is not None:
+        previous.dispose()
+    return engine
+
+
+def get_engine() -> Engine:
+    """The default engine, created from DATABASE_URL on first use"""
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _set_engine(create_db_engine())
+    return _engine
+
+
+def _set_engine(engine: Engine):
+    global _engine
+    _engine = engine
+    SessionLocal.configure(bind=engine)
+
+
+def configure_replica(url: Optional[str], **engine_options) -> Optional[Engine]:
+    """Create the read replica engine behind get_read_db (None turns replica routing off)"""
+    global _replica_engine, _replica_loaded
+    engine = create_db_engine(url, **engine_options) if url else None
+    with _engine_lock:
+        previous, _replica_engine, _replica_loaded = _replica_engine, engine, True
+        ReplicaSessionLocal.configure(bind=engine)
+    if previous is not None:
+        previous.dispose()
+    return engine
+
+
+def get_replica_engine() -> Optional[Engine]:
+    """The replica engine, created from DATABASE_REPLICA_URL on first use (None if unset)"""
+    if not _replica_loaded:
+        configure_replica(DATABASE_REPLICA_URL)
+    return _replica_engine
+
+
+def get_pool_stats(replica: bool = False) -> Optional[Dict[str, Any]]:
+    """Connection pool counters of the default (or replica) engine, None until it is created"""
+    engine = _replica_engine if replica else _engine
+    if engine is None:
+        return None
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+        )
+    return stats
+
+
+# The default dependency for routers: Depends(get_db).
+# Consumers may still override it via app.dependency_overrides.
 def get_db():
-    raise NotImplementedError("Dependency Override Required: The consumer app must override get_db with a real connection.")
+    get_engine()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReadYourWritesTracker:
+    """
+    Remembers which session cookies wrote recently.
+
+    Their reads go to the primary until the window passes, so a client
+    never reads its own write back from a lagging replica. Entries are
+    kept in deadline order, which makes pruning a pop from the front.
+    """
+
+    def __init__(self, window_seconds: int = READ_YOUR_WRITES_SECONDS, max_entries: int = 100000):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._deadlines: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, key: Optional[str]):
+        if not key or self.window_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._deadlines[key] = now + self.window_seconds
+            self._deadlines.move_to_end(key)
+            while self._deadlines:
+                oldest, deadline = next(iter(self._deadlines.items()))
+                if deadline > now and len(self._deadlines) <= self.max_entries:
+                    break
+                del self._deadlines[oldest]
+
+    def is_recent(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            deadline = self._deadlines.get(key)
+        return deadline is not None and deadline > time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._deadlines.clear()
+
+
+read_your_writes = ReadYourWritesTracker()
+
+
+# For read-only endpoints and dependencies: Depends(get_read_db).
+# Falls back to the primary session when no replica is configured or the
+# caller wrote within the read-your-writes window.
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    if get_replica_engine() is None or read_your_writes.is_recent(request.cookies.get("session_id")):
+        yield primary
+        return
+
+    db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def is_replica_session(db) -> bool:
+    """Whether db reads from the replica (and so may lag behind recent writes)"""
+    return bool(db.info.get("replica"))
+
+
+# The async counterpart, used by create_app(async_db=True).
+# Consumers override it with a generator yielding an AsyncSession.
+async def get_async_db():
+    raise NotImplementedError("Dependency Override Required: The consumer app must override get_async_db with a real AsyncSession.")
+
+
+def is_async_session(db) -> bool:
+    return AsyncSession is not None and isinstance(db, AsyncSession)
+
+
+def as_sync_session(db):
+    """The ORM Session behind db, for building queries that run later via run_db"""
+    return db.sync_session if is_async_session(db) else db
+
+
+async def run_db(db, fn, *args):
+    """
+    Call fn(session, *args) from async code with either kind of session.
+
+    An AsyncSession runs fn through run_sync on the event loop; a sync
+    Session runs it in the thread pool, as Starlette does for sync endpoints.
+    """
+    if is_async_session(db):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+
+async def iterate_in_session(db, iterator):
+    """Drive a sync iterator that does DB I/O (e.g. yield_per) from async code"""
+    done = object()
+    while True:
+        item = await run_db(db, lambda _session: next(iterator, done))
+        if item is done:
+            return
+        yield item
+
+
+@contextmanager
+def session_from_dependency(app):
+    """
+    Open a DB session outside a request (background tasks, lifespan hooks).
+
+    Uses whatever the consumer app installed for get_db via
+    dependency_overrides, so background work shares the request path's
+    connection setup.
+    """
+    provider = app.dependency_overrides.get(get_db, get_db)
+    result = provider()
+    if inspect.isgenerator(result):
+        try:
+            yield next(result)
+        finally:
+            result.close()
+    else:
+        try:
+            yield result
+        finally:
+            result.close()
+
+
+@asynccontextmanager
+async def async_session_from_dependency(app):
+    """The get_async_db counterpart of session_from_dependency"""
+    provider = app.dependency_overrides.get(get_async_db, get_async_db)
+    result = provider()
+    if inspect.isasyncgen(result):
+        try:
+            yield await result.__anext__()
+        finally:
+            await result.aclose()
+    else:
+        session = await result if inspect.isawaitable(result) else result
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def run_with_app_db(app, fn, *args):
+    """
+    Call fn(session, *args) outside a request with a session from the app's
+    configured provider: get_async_db when the app was created with
+    async_db=True, get_db otherwise.
+    """
+    if getattr(app.state, "async_db", False):
+        async with async_session_from_dependency(app) as db:
+            return await db.run_sync(fn, *args)
+
+    def call():
+        with session_from_dependency(app) as db:
+            return fn(db, *args)
+
+    return await run_in_threadpool(call)
@@ -1,11 +1,13 @@
+import logging
 from fastapi import Request, Depends, Cookie
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from .schemas import UserRead
 from .database import get_db
-from .utils.security import get_session_from_db, create_user_read_from_orm
+from .utils.security import resolve_session_user
+from .utils.permissions import permission_registry
 from .exceptions import APIError
-from .logger import get_logger, mask_session_id, get_client_ip
+from .logger import get_logger, mask_session_id, get_client_ip, get_route_path, log_sampler
 
 logger = get_logger(__name__)
 
@@ -14,64 +16,76 @@ def get_current_user(
     session_id: Optional[str] = Cookie(None),
     db: Session = Depends(get_db)
 ) -> UserRead:
-    """Get current user from session cookie"""
+    """
+    Get current user from session cookie.
+
+    Resolved against the primary: a lagging replica could still show a
+    revoked session or deactivated user, and the result is cached.
+    """
     client_ip = get_client_ip(request)
     path = request.url.path
+    route = get_route_path(request)
+    # One sampling decision covers this request's info lines
+    log_info = logger.isEnabledFor(logging.INFO) and log_sampler.allow(route)
+
+    if log_info:
+        logger.info(
+            "Authentication attempt from IP: %s, Path: %s", client_ip, path,
+            extra={"client_ip": client_ip, "path": path},
+        )
     
-    logger.info(f"Authentication attempt from IP: {client_ip}, Path: {path}")
-    
+    # Failures are logged once, by the APIError handler; only details it
+    # can't see are added here, at debug level
     if not session_id:
-        logger.error(
-            f"Authentication failed: No session cookie provided "
-            f"(IP: {client_ip}, Path: {path})"
-        )
         raise APIError(
             status_code=401, error_code="AUTH-003", message="Not authenticated"
         )
     
-    logger.debug(f"Session cookie present: {mask_session_id(session_id)} (IP: {client_ip})")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Session cookie present: %s (IP: %s)", mask_session_id(session_id), client_ip)
     
-    session = get_session_from_db(db, session_id)
-    if not session:
-        logger.error(
-            f"Authentication failed: Session not found or expired "
-            f"(Session: {mask_session_id(session_id)}, IP: {client_ip}, Path: {path})"
-        )
+    user = resolve_session_user(db, session_id)
+    if user is None:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Session not found or expired: %s (IP: %s, Path: %s)",
+                mask_session_id(session_id), client_ip, path,
+            )
         raise APIError(
             status_code=401, error_code="AUTH-002", message="Session expired"
         )
 
-    user = create_user_read_from_orm(session.user)
-    logger.info(
-        f"Authentication successful for user: {user.email} (ID: {user.id}, "
-        f"IP: {client_ip}, Roles: {user.roles})"
-    )
+    if log_info:
+        logger.info(
+            "Authentication successful for user: %s (ID: %s, IP: %s, Roles: %s)",
+            user.email, user.id, client_ip, user.roles,
+            extra={"client_ip": client_ip, "path": path, "user_id": user.id},
+        )
     
     return user
 
 
 def require_permissions(required: List[str]):
+    # Compiled once, when the route is defined
+    required_mask = permission_registry.mask(required)
+
     def dependency(user: UserRead = Depends(get_current_user)):
-        user_perms = set(user.permissions)
-        
-        logger.debug(
-            f"Permission check for user {user.email}: "
-            f"Required: {required}, Available: {sorted(user_perms)}"
+        if user.permission_mask & required_mask == required_mask:
+            logger.debug("Permission check passed for user %s", user.email)
+            return user
+
+        missing = next(
+            p for p in required if not user.permission_mask & permission_registry.bit(p)
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Permission denied for user %s: Missing permission '%s'. User has: %s",
+                user.email, missing, sorted(user.permissions),
+            )
+        raise APIError(
+            status_code=403,
+            error_code="PERM-001",
+            message=f"Permission denied: {missing} required",
         )
-        
-        for p in required:
-            if p not in user_perms:
-                logger.warning(
-                    f"Permission denied for user {user.email}: "
-                    f"Missing permission '{p}'. User has: {sorted(user_perms)}"
-                )
-                raise APIError(
-                    status_code=403,
-                    error_code="PERM-001",
-                    message=f"Permission denied: {p} required",
-                )
-        
-        logger.debug(f"Permission check passed for user {user.email}")
-        return user
 
     return dependency
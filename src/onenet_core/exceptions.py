@@ -2,7 +2,8 @@ from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from typing import Dict, Any
-from .logger import get_logger, get_client_ip
+from .logger import get_logger, get_client_ip, get_route_path, log_sampler
+from .utils.metrics import record_api_error
 
 logger = get_logger(__name__)
 
@@ -15,13 +16,18 @@ class APIError(Exception):
 
 async def api_error_handler(request: Request, exc: APIError):
     request_id = getattr(request.state, "request_id", None)
-    client_ip = get_client_ip(request)
-    
-    logger.error(
-        f"API Error: {exc.error_code} - {exc.message} "
-        f"(Status: {exc.status_code}, IP: {client_ip}, Path: {request.url.path}, "
-        f"Request ID: {request_id})"
-    )
+    record_api_error(exc.error_code, exc.status_code)
+
+    if log_sampler.allow(get_route_path(request), exc.error_code):
+        client_ip = get_client_ip(request)
+        logger.error(
+            "API Error: %s - %s (Status: %s, IP: %s, Path: %s, Request ID: %s)",
+            exc.error_code, exc.message, exc.status_code, client_ip, request.url.path, request_id,
+            extra={
+                "error_code": exc.error_code, "status_code": exc.status_code,
+                "client_ip": client_ip, "path": request.url.path, "request_id": request_id,
+            },
+        )
     
     payload = {
         "success": False,
@@ -34,8 +40,7 @@ async def api_error_handler(request: Request, exc: APIError):
 
 async def http_exception_handler(request: Request, exc: HTTPException):
     request_id = getattr(request.state, "request_id", None)
-    client_ip = get_client_ip(request)
-    
+
     # If detail is dict with error_code, keep it. Otherwise build a generic one.
     if isinstance(exc.detail, dict) and "error_code" in exc.detail:
         payload = exc.detail
@@ -49,11 +54,19 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         }
     payload["request_id"] = request_id
     
-    logger.warning(
-        f"HTTP Exception: {payload.get('error_code', 'UNKNOWN')} - {payload.get('message', 'Unknown error')} "
-        f"(Status: {exc.status_code}, IP: {client_ip}, Path: {request.url.path}, "
-        f"Request ID: {request_id})"
-    )
+    error_code = payload.get("error_code", "UNKNOWN")
+    record_api_error(error_code, exc.status_code)
+    if log_sampler.allow(get_route_path(request), error_code):
+        client_ip = get_client_ip(request)
+        logger.warning(
+            "HTTP Exception: %s - %s (Status: %s, IP: %s, Path: %s, Request ID: %s)",
+            error_code, payload.get("message", "Unknown error"),
+            exc.status_code, client_ip, request.url.path, request_id,
+            extra={
+                "error_code": error_code, "status_code": exc.status_code,
+                "client_ip": client_ip, "path": request.url.path, "request_id": request_id,
+            },
+        )
     
     return JSONResponse(status_code=exc.status_code, content=payload)
 
@@ -61,7 +74,6 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle Pydantic validation errors"""
     request_id = getattr(request.state, "request_id", None)
-    client_ip = get_client_ip(request)
 
     errors = []
     if hasattr(exc, "errors"):
@@ -71,11 +83,17 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
                 {"field": field, "message": error["msg"], "type": error["type"]}
             )
 
-    logger.warning(
-        f"Validation Error: {len(errors)} field(s) failed validation "
-        f"(IP: {client_ip}, Path: {request.url.path}, Request ID: {request_id}, "
-        f"Errors: {errors})"
-    )
+    record_api_error("VAL-001", 422)
+    if log_sampler.allow(get_route_path(request), "VAL-001"):
+        client_ip = get_client_ip(request)
+        logger.warning(
+            "Validation Error: %s field(s) failed validation (IP: %s, Path: %s, Request ID: %s, Errors: %s)",
+            len(errors), client_ip, request.url.path, request_id, errors,
+            extra={
+                "error_code": "VAL-001", "status_code": 422,
+                "client_ip": client_ip, "path": request.url.path, "request_id": request_id,
+            },
+        )
 
     payload = {
         "success": False,
@@ -1,26 +1,126 @@
 """Centralized logging configuration for onenet_core package."""
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+from .config import (
+    LOG_LEVEL, LOG_JSON, LOG_SAMPLE_RATES, LOG_ERROR_BURST, LOG_ERROR_RATE_PER_SECOND,
+    LOG_SUPPRESSION_SUMMARY_SECONDS,
+)
 
 # Configure logging format
 LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s:%(funcName)s] %(message)s"
 LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-def setup_logging(level: int = logging.DEBUG):
+PACKAGE_LOGGER = "onenet_core"
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Set per request by utils.middleware.RequestIdMiddleware
+request_id_var: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("request_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, including ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
     """
-    Setup logging configuration for the application.
-    
+    QueueHandler that enqueues the record untouched.
+
+    The stock prepare() formats the message in the calling thread; the
+    listener and its formatter are in this process, so formatting (and
+    the %-style argument merge) can wait for the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Context variables are not visible from the listener thread
+        if not hasattr(record, "request_id"):
+            request_id = request_id_var.get()
+            if request_id is not None:
+                record.request_id = request_id
+        return record
+
+
+def setup_logging(
+    level: Union[int, str] = LOG_LEVEL,
+    json_format: bool = LOG_JSON,
+    stream=None,
+):
+    """
+    Send the package's logs through a queue to a background writer.
+
+    Only the ``onenet_core`` logger is configured (it stops propagating to
+    the root logger); the host application's own logging setup is left
+    alone. Importing the package does not call this.
+
     Args:
-        level: Logging level (default: DEBUG for development)
+        level: Logging level for the package loggers (default: LOG_LEVEL)
+        json_format: Emit JSON lines instead of the plain text format
+        stream: Output stream (default: stdout)
     """
-    logging.basicConfig(
-        level=level,
-        format=LOG_FORMAT,
-        datefmt=LOG_DATE_FORMAT,
-        stream=sys.stdout,
-        force=True  # Override any existing configuration
-    )
+    global _listener, _handler
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if json_format:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _handler = DeferredQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    package_logger = logging.getLogger(PACKAGE_LOGGER)
+    package_logger.addHandler(_handler)
+    package_logger.setLevel(level.upper() if isinstance(level, str) else level)
+    package_logger.propagate = False
+
+
+def shutdown_logging():
+    """Flush and stop the background writer started by setup_logging"""
+    global _listener, _handler
+    log_sampler.flush_summaries()
+    if _handler is not None:
+        logging.getLogger(PACKAGE_LOGGER).removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
 
 def get_logger(name: str) -> logging.Logger:
     """
@@ -72,5 +172,131 @@ def get_client_ip(request) -> str:
     
     return "unknown"
 
-# Initialize logging when module is imported
-setup_logging()
+def get_route_path(request) -> str:
+    """
+    Route template of a request (e.g. /users/{user_id}), falling back to the raw path.
+
+    Args:
+        request: FastAPI Request object
+
+    Returns:
+        Path used as the sampling key for the request
+    """
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse LOG_SAMPLE_RATES, e.g. "/auth/me=0.1,AUTH-002=0.05".
+
+    Args:
+        spec: Comma-separated key=rate pairs; keys are routes or error codes
+
+    Returns:
+        Mapping of key to a rate between 0 and 1; malformed entries are
+        skipped with a warning
+    """
+    rates = {}
+    for item in spec.split(","):
+        key, sep, rate = item.strip().partition("=")
+        if not item.strip():
+            continue
+        try:
+            value = float(rate) if sep and key.strip() else float("nan")
+        except ValueError:
+            value = float("nan")
+        if value != value:
+            logging.getLogger(f"{PACKAGE_LOGGER}.sampling").warning(
+                "Ignoring malformed LOG_SAMPLE_RATES entry %r", item.strip()
+            )
+            continue
+        rates[key.strip()] = min(max(value, 0.0), 1.0)
+    return rates
+
+
+class LogSampler:
+    """
+    Decides whether a request-path log line is emitted.
+
+    Every line is first sampled at the lowest rate configured for its
+    route or error code. Error lines then pass a token bucket per
+    (error code, route), so a flood of identical errors is capped at
+    ``burst`` lines plus ``rate_per_second``. Dropped lines are counted and
+    reported as one "N similar events suppressed" line per key every
+    ``summary_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        burst: int = LOG_ERROR_BURST,
+        rate_per_second: float = LOG_ERROR_RATE_PER_SECOND,
+        summary_interval: int = LOG_SUPPRESSION_SUMMARY_SECONDS,
+        max_keys: int = 10000,
+    ):
+        self.rates = rates or {}
+        self.burst = burst
+        self.rate_per_second = rate_per_second
+        self.summary_interval = summary_interval
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._suppressed: Dict[Tuple[Optional[str], str], int] = {}
+        self._last_summary = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self, path: str, error_code: Optional[str] = None) -> bool:
+        now = time.monotonic()
+        if now - self._last_summary >= self.summary_interval:
+            self.flush_summaries(now)
+
+        rate = min(self.rates.get(path, 1.0), self.rates.get(error_code, 1.0) if error_code else 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self._suppress(error_code, path)
+            return False
+
+        if error_code is None or self.rate_per_second <= 0:
+            return True
+
+        key = (error_code, path)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_second)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+        return False
+
+    def _suppress(self, error_code: Optional[str], path: str):
+        with self._lock:
+            key = (error_code, path)
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+
+    def flush_summaries(self, now: Optional[float] = None):
+        """Log and reset the suppressed-event counts"""
+        with self._lock:
+            suppressed, self._suppressed = self._suppressed, {}
+            self._last_summary = now if now is not None else time.monotonic()
+        for (error_code, path), count in suppressed.items():
+            _sampler_logger.warning(
+                "%s similar events suppressed (error_code=%s, route=%s)",
+                count, error_code, path,
+                extra={"suppressed": count, "error_code": error_code, "path": path},
+            )
+
+
+_sampler_logger = logging.getLogger(f"{PACKAGE_LOGGER}.sampling")
+
+log_sampler = LogSampler(parse_sample_rates(LOG_SAMPLE_RATES))
+
+# A library must not configure logging on import; the host app (or an
+# explicit setup_logging() call) decides where records go
+logging.getLogger(PACKAGE_LOGGER).addHandler(logging.NullHandler())
@@ -1,8 +1,7 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError, HTTPException
-from fastapi import Request
-from uuid import uuid4
 
 from .exceptions import APIError, api_error_handler, http_exception_handler, validation_exception_handler
 from .routers.auth import router_auth
@@ -11,21 +10,53 @@ from .routers.roles import router_roles, router_permissions
 from .routers.wallet import router_wallet
 from .routers.meta import router_meta
 from .routers.websocket import router_ws
+from .utils.sweeper import SessionSweeper
+from .utils.write_behind import WriteBehindFlusher
+from .utils.async_routes import async_router
+from .utils.middleware import RequestIdMiddleware, ReadYourWritesMiddleware
+from .utils.metrics import MetricsMiddleware
+from .utils.sql_accounting import SqlAccountingMiddleware
+from .config import SQL_ACCOUNTING, SEARCH_INDEX
+from .database import run_with_app_db
+from .utils.search import install_search_index
+from .utils.permissions import preload_permission_bits
+from .logger import get_logger
 
-# Middleware
-async def request_id_middleware(request: Request, call_next):
-    request_id = str(uuid4())
-    request.state.request_id = request_id
-    response = await call_next(request)
-    response.headers["X-Request-ID"] = request_id
-    return response
+logger = get_logger(__name__)
 
-def create_app() -> FastAPI:
+# Background tasks
+@asynccontextmanager
+async def background_tasks_lifespan(app: FastAPI):
+    try:
+        await run_with_app_db(app, preload_permission_bits)
+        if SEARCH_INDEX == "auto":
+            await run_with_app_db(app, install_search_index)
+    except NotImplementedError:
+        logger.warning("Startup database setup skipped: the app's database dependency has not been overridden")
+    sweeper = SessionSweeper(app)
+    flusher = WriteBehindFlusher(app)
+    sweeper.start()
+    flusher.start()
+    try:
+        yield
+    finally:
+        await sweeper.stop()
+        # Runs a final flush so buffered timestamps survive shutdown
+        await flusher.stop()
+
+def create_app(async_db: bool = False, sql_accounting: bool = SQL_ACCOUNTING) -> FastAPI:
+    """
+    Build the app. With async_db=True the routers take an AsyncSession from
+    get_async_db (which the consumer overrides instead of get_db) and run
+    on the event loop rather than the thread pool. sql_accounting adds
+    per-request statement counts and N+1 warnings.
+    """
     app = FastAPI(
         title="OneNet Bridge Demo Backend",
         description="Simulated Bridge utilities and mock OSOS APIs.",
         version="1.0.0",
     )
+    app.state.async_db = async_db
 
     # CORS
     app.add_middleware(
@@ -37,18 +68,26 @@ def create_app() -> FastAPI:
     )
 
     # Middleware
-    app.middleware("http")(request_id_middleware)
+    app.add_middleware(ReadYourWritesMiddleware)
+    if sql_accounting:
+        # Inside RequestIdMiddleware so its log lines carry the request id
+        app.add_middleware(SqlAccountingMiddleware)
+    app.add_middleware(RequestIdMiddleware)
+    app.add_middleware(MetricsMiddleware)
     app.add_exception_handler(APIError, api_error_handler)
     app.add_exception_handler(HTTPException, http_exception_handler)
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
-    app.include_router(router_auth)
-    app.include_router(router_users)
-    app.include_router(router_roles)
-    app.include_router(router_permissions)
-    app.include_router(router_wallet)
-    app.include_router(router_meta)
-    app.include_router(router_ws)
+    routers = [
+        router_auth, router_users, router_roles, router_permissions,
+        router_wallet, router_meta, router_ws,
+    ]
+    for router in routers:
+        app.include_router(async_router(router) if async_db else router)
+
+    # Attached as a router lifespan so the consumer's own startup/shutdown
+    # handlers keep running alongside it
+    app.include_router(APIRouter(lifespan=background_tasks_lifespan))
 
     return app
 
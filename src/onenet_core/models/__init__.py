@@ -1,4 +1,4 @@
 from .user import User, Role, Permission
-from .session import Session
+from .session import Session, SessionRevocation
 
-__all__ = ["User", "Role", "Permission", "Session"]
+__all__ = ["User", "Role", "Permission", "Session", "SessionRevocation"]
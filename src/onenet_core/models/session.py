@@ -5,7 +5,21 @@ from ..database import Base
 class Session(Base):
     __tablename__ = "sessions"
     session_id = Column(String, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    expires_at = Column(DateTime)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    expires_at = Column(DateTime, index=True)
+    # Written in batches by utils.write_behind, so it may lag slightly
+    last_seen_at = Column(DateTime, nullable=True)
     
     user = relationship("User")
+
+
+# Token mode revocations: a single token (token_id), or every token of
+# user_id issued at or before revoked_at
+class SessionRevocation(Base):
+    __tablename__ = "session_revocations"
+    id = Column(Integer, primary_key=True)
+    token_id = Column(String, nullable=True)
+    user_id = Column(Integer, nullable=True)
+    revoked_at = Column(DateTime, index=True)
+    # Once every token the entry covers has expired, the entry can be purged
+    expires_at = Column(DateTime, index=True)
@@ -18,6 +18,15 @@ role_permissions = Table(
     Column("permission_id", Integer, ForeignKey("permissions.id")),
 )
 
+# Denormalized user -> permission closure, maintained by
+# utils.permissions.sync_effective_permissions
+user_effective_permissions = Table(
+    "user_effective_permissions",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("permission_id", Integer, ForeignKey("permissions.id"), primary_key=True),
+)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -28,8 +37,13 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=True)
     last_login = Column(DateTime, nullable=True)
+    # Bumped whenever the effective permissions are rematerialized; 0 = never
+    permissions_version = Column(Integer, default=0, nullable=False)
 
     roles = relationship("Role", secondary=user_roles, back_populates="users")
+    effective_permissions = relationship(
+        "Permission", secondary=user_effective_permissions, viewonly=True
+    )
 
 class Role(Base):
     __tablename__ = "roles"
@@ -9,8 +9,14 @@ from ..exceptions import APIError
 from ..database import get_db
 from ..models.user import User
 from ..utils.security import (
-    _now, create_session_for_user, delete_session_from_db, create_user_read_from_orm
+    _now, create_session_for_user, delete_session_from_db, create_user_read_from_orm,
+    revoke_user_sessions
 )
+from ..utils.permissions import sync_effective_permissions
+from ..utils.role_catalog import role_catalog
+from ..utils.search import get_search_index
+from ..utils.session_cache import session_cache
+from ..utils.write_behind import write_behind
 from ..dependencies import get_current_user
 from ..config import SESSION_TTL_SECONDS
 
@@ -57,11 +63,15 @@ def register(
         new_user.roles.append(user_role)
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    db.flush()
+    sync_effective_permissions(db, [new_user.id])
 
-    # Create session
-    session_id = create_session_for_user(db, new_user)
+    # Create session in the same transaction as the user
+    session_id = create_session_for_user(db, new_user, commit=False)
+    user_dto = create_user_read_from_orm(new_user)
+    db.commit()
+    role_catalog.invalidate()
+    get_search_index().upsert(new_user)
 
     # Set HTTP-only cookie
     response.set_cookie(
@@ -74,8 +84,6 @@ def register(
         path="/",
     )
 
-    user_dto = create_user_read_from_orm(new_user)
-    
     return RegisterResponse(
         success=True,
         data={
@@ -89,7 +97,7 @@ def register(
             },
             "session_id": session_id,
         },
-        message=f"Registration successful! Welcome, {new_user.name}. Your account has been created and you are now logged in.",
+        message=f"Registration successful! Welcome, {user_dto.name}. Your account has been created and you are now logged in.",
     )
 
 
@@ -115,12 +123,16 @@ def login(
             message="Login failed: The password you entered is incorrect. Please try again or reset your password.",
         )
 
-    # Update last_login
-    user.last_login = _now()
+    # last_login is coalesced and written in the background when a flusher
+    # is running; otherwise it goes into the same commit as the session
+    login_at = _now()
+    if not write_behind.record_login(user.id, login_at):
+        user.last_login = login_at
+    session_id = create_session_for_user(db, user, commit=False)
+    user_dto = create_user_read_from_orm(user)
+    user_dto.last_login = login_at
     db.commit()
 
-    session_id = create_session_for_user(db, user)
-
     # Set HTTP-only cookie
     response.set_cookie(
         key="session_id",
@@ -132,8 +144,6 @@ def login(
         path="/",
     )
 
-    user_dto = create_user_read_from_orm(user)
-
     return LoginResponse(
         success=True,
         data={
@@ -147,7 +157,7 @@ def login(
             },
             "session_id": session_id,
         },
-        message=f"Login successful! Welcome back, {user.name}.",
+        message=f"Login successful! Welcome back, {user_dto.name}.",
     )
 
 
@@ -186,6 +196,7 @@ def get_current_user_profile(user: UserRead = Depends(get_current_user)):
 @router_auth.post("/change-password", response_model=ChangePasswordResponse)
 def change_password(
     payload: ChangePasswordRequest, 
+    response: Response,
     user: UserRead = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -211,8 +222,22 @@ def change_password(
             message="Password change failed: New password must be at least 8 characters long.",
         )
 
+    # New password, sign-out of every existing session and the caller's
+    # fresh session commit together
     db_user.password_hash = payload.new_password
+    revoke_user_sessions(db, db_user.id, commit=False)
+    session_id = create_session_for_user(db, db_user, commit=False)
     db.commit()
+    session_cache.invalidate_user(db_user.id)
+    response.set_cookie(
+        key="session_id",
+        value=session_id,
+        httponly=True,
+        secure=False,
+        samesite="lax",
+        max_age=SESSION_TTL_SECONDS,
+        path="/",
+    )
 
     return ChangePasswordResponse(
         success=True,
@@ -1,6 +1,9 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from ..schemas import HealthResponse, ConfigResponse, FeatureFlag
 from ..utils.security import _now
+from ..database import get_pool_stats
+from ..utils.metrics import metrics
 
 router_meta = APIRouter(prefix="/meta", tags=["meta"])
 
@@ -12,11 +15,17 @@ def health_check():
             "status": "healthy",
             "database": "healthy",
             "redis": "healthy",
+            "database_pool": get_pool_stats(),
             "timestamp": _now().isoformat(),
         },
     )
 
 
+@router_meta.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @router_meta.get("/config", response_model=ConfigResponse)
 def get_config():
     flags = [
@@ -1,39 +1,23 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from ..schemas import UserRead, RoleCreateRequest
 from ..exceptions import APIError
-from ..database import get_db
-from ..models.user import Role, Permission, User
+from ..database import get_db, get_read_db
+from ..models.user import Role, Permission
 from ..dependencies import require_permissions
+from ..utils.role_catalog import role_catalog, catalog_response
 
 router_roles = APIRouter(prefix="/roles", tags=["roles"])
 router_permissions = APIRouter(prefix="/permissions", tags=["permissions"])
 
 @router_roles.get("")
 def list_roles(
+    request: Request,
     user: UserRead = Depends(require_permissions(["role:read"])),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    roles = db.query(Role).all()
-    roles_data = []
-    
-    for role in roles:
-        user_count = db.query(User).join(User.roles).filter(Role.id == role.id).count()
-        
-        permissions = [
-            {"id": p.id, "name": p.name, "description": p.description}
-            for p in role.permissions
-        ]
-
-        roles_data.append({
-            "id": role.id,
-            "name": role.name,
-            "description": role.description,
-            "permissions": permissions,
-            "user_count": user_count,
-        })
-
-    return {"success": True, "data": {"roles": roles_data}}
+    snapshot = role_catalog.snapshot(db)
+    return catalog_response(request, snapshot.roles_body, snapshot.roles_etag, snapshot.version)
 
 
 @router_roles.post("", status_code=201)
@@ -63,6 +47,7 @@ def create_role(
     db.add(new_role)
     db.commit()
     db.refresh(new_role)
+    role_catalog.invalidate()
 
     permissions = [
         {"id": p.id, "name": p.name}
@@ -83,21 +68,9 @@ def create_role(
 
 @router_permissions.get("")
 def list_permissions(
+    request: Request,
     user: UserRead = Depends(require_permissions(["role:read"])),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    perms = db.query(Permission).all()
-    return {
-        "success": True,
-        "data": {
-            "permissions": [
-                {
-                    "id": p.id,
-                    "name": p.name,
-                    "description": p.description,
-                    "category": p.category,
-                }
-                for p in perms
-            ]
-        },
-    }
+    snapshot = role_catalog.snapshot(db)
+    return catalog_response(request, snapshot.permissions_body, snapshot.permissions_etag, snapshot.version)
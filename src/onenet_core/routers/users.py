@@ -1,43 +1,59 @@
-from fastapi import APIRouter, Depends, Query
-from typing import Optional
+import codecs
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import Dict, List, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 from ..schemas import (
     UserRead, UserCreateRequest, UserUpdateRequest, AssignRoleRequest
 )
 from ..exceptions import APIError
-from ..database import get_db
-from ..models.user import User, Role
-from ..utils.security import _now, create_user_read_from_orm
+from ..database import get_db, get_read_db, as_sync_session, iterate_in_session, run_db
+from ..models.user import User, Role, user_roles
+from ..utils.security import (
+    _now, create_user_read_from_orm, get_effective_permissions, revoke_user_sessions
+)
+from ..utils.permissions import sync_effective_permissions
+from ..utils.role_catalog import role_catalog
+from ..utils.session_cache import session_cache
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils.search import get_search_index
 from ..dependencies import require_permissions
 
 router_users = APIRouter(prefix="/users", tags=["users"])
 
-@router_users.get("")
-def list_users(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
+# Sortable columns for list_users; User.id is always the keyset tiebreaker.
+# Keyset comparisons assume these columns are populated (they are on every
+# write path in this package).
+SORT_COLUMNS = {
+    "created_at": User.created_at,
+    "name": User.name,
+    "email": User.email,
+}
+
+
+def _filter_users(
+    query,
     search: Optional[str] = None,
     role: Optional[str] = None,
     is_active: Optional[bool] = None,
-    sort_by: Optional[str] = Query(None, description="Field to sort by (e.g., created_at, name, email)"),
-    sort_order: Optional[str] = Query("asc", description="Sort order: asc or desc"),
-    created_after: Optional[str] = Query(None, description="ISO 8601 date filter"),
-    created_before: Optional[str] = Query(None, description="ISO 8601 date filter"),
-    user: UserRead = Depends(require_permissions(["user:read"])),
-    db: Session = Depends(get_db)
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
 ):
-    query = db.query(User)
-
-    # Apply filters
+    """Apply the list_users filters to a User query"""
     if search:
         search_lower = f"%{search.lower()}%"
-        query = query.filter(
-            (User.name.ilike(search_lower)) | (User.email.ilike(search_lower))
-        )
+        query = query.filter(get_search_index().clause(search_lower))
     
     if role:
-        query = query.join(User.roles).filter(Role.name == role)
+        # EXISTS rather than a join so a user is never returned twice
+        query = query.filter(User.roles.any(Role.name == role))
     
     if is_active is not None:
         query = query.filter(User.is_active == is_active)
@@ -57,9 +73,122 @@ def list_users(
         except:
             pass
 
+    return query
+
+
+def _serialize_user_item(u: User) -> dict:
+    return {
+        "id": u.id,
+        "email": u.email,
+        "name": u.name,
+        "is_active": u.is_active,
+        "roles": [r.name for r in u.roles],
+        "created_at": u.created_at.isoformat(),
+        "last_login": u.last_login.isoformat() if u.last_login else None,
+    }
+
+
+def _cursor_value(position: dict, sort_key: str):
+    """
+    The sort column value carried by a decoded cursor.
+
+    Raises:
+        ValueError: If it is missing, not a string (or null), or not an ISO date for created_at
+    """
+    if "v" not in position:
+        raise ValueError("Cursor has no sort value")
+    value = position["v"]
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError("Cursor sort value must be a string")
+    if sort_key == "created_at":
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _keyset_page(query, page_size: int, sort_by: Optional[str], reverse_order: bool, cursor: Optional[str]):
+    """Return (users, next_cursor) for one keyset page ordered by (sort column, id)"""
+    column = SORT_COLUMNS.get(sort_by)
+    sort_key = sort_by if column is not None else "id"
+    order = "desc" if reverse_order else "asc"
+
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+            if position.get("s") != sort_key or position.get("o") != order:
+                raise ValueError("Cursor was issued for a different sort order")
+            value = _cursor_value(position, sort_key) if column is not None else None
+        except ValueError:
+            raise APIError(
+                status_code=400,
+                error_code="VAL-001",
+                message="Invalid cursor: it is malformed or was issued for a different sort order. Restart from the first page.",
+            ) from None
+
+        last_id = position["id"]
+        if column is None:
+            query = query.filter(User.id < last_id if reverse_order else User.id > last_id)
+        elif reverse_order:
+            query = query.filter(or_(column < value, and_(column == value, User.id < last_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, User.id > last_id)))
+
+    if column is None:
+        query = query.order_by(User.id.desc() if reverse_order else User.id)
+    elif reverse_order:
+        query = query.order_by(column.desc(), User.id.desc())
+    else:
+        query = query.order_by(column, User.id)
+
+    users = query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(users) > page_size:
+        users = users[:page_size]
+        last = users[-1]
+        value = getattr(last, sort_key)
+        next_cursor = encode_cursor(sort_key, order, value, last.id)
+    return users, next_cursor
+
+
+@router_users.get("")
+def list_users(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    search: Optional[str] = None,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    sort_by: Optional[str] = Query(None, description="Field to sort by (e.g., created_at, name, email)"),
+    sort_order: Optional[str] = Query("asc", description="Sort order: asc or desc"),
+    created_after: Optional[str] = Query(None, description="ISO 8601 date filter"),
+    created_before: Optional[str] = Query(None, description="ISO 8601 date filter"),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$", description="Pagination mode: offset or cursor"),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from the previous page (cursor mode)"),
+    include_total: bool = Query(False, description="Also compute the total count (cursor mode)"),
+    user: UserRead = Depends(require_permissions(["user:read"])),
+    db: Session = Depends(get_read_db)
+):
+    # Roles for the whole page are fetched with one extra IN query
+    query = _filter_users(
+        as_sync_session(db).query(User).options(selectinload(User.roles)),
+        search, role, is_active, created_after, created_before,
+    )
+    reverse_order = bool(sort_order and sort_order.lower() == "desc")
+
+    if pagination == "cursor":
+        total = query.count() if include_total else None
+        users, next_cursor = _keyset_page(query, page_size, sort_by, reverse_order, cursor)
+        data = {
+            "items": [_serialize_user_item(u) for u in users],
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+        }
+        if include_total:
+            data["total"] = total
+        return {"success": True, "data": data}
+
     # Sorting
     if sort_by:
-        reverse_order = sort_order and sort_order.lower() == "desc"
         if sort_by == "created_at":
             query = query.order_by(User.created_at.desc() if reverse_order else User.created_at)
         elif sort_by == "name":
@@ -75,18 +204,7 @@ def list_users(
     return {
         "success": True,
         "data": {
-            "items": [
-                {
-                    "id": u.id,
-                    "email": u.email,
-                    "name": u.name,
-                    "is_active": u.is_active,
-                    "roles": [r.name for r in u.roles],
-                    "created_at": u.created_at.isoformat(),
-                    "last_login": u.last_login.isoformat() if u.last_login else None,
-                }
-                for u in users
-            ],
+            "items": [_serialize_user_item(u) for u in users],
             "total": total,
             "page": page,
             "page_size": page_size,
@@ -95,11 +213,75 @@ def list_users(
     }
 
 
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = ["id", "email", "name", "is_active", "roles", "created_at", "last_login"]
+
+
+def _stream_user_export(query, export_format: str):
+    """Yield the export body one chunk (EXPORT_CHUNK_SIZE users) at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+
+    # yield_per streams rows from a server-side cursor; selectinload then
+    # fetches the roles for each chunk with a single IN query
+    for count, u in enumerate(query.yield_per(EXPORT_CHUNK_SIZE), start=1):
+        item = _serialize_user_item(u)
+        if writer:
+            item["roles"] = ";".join(item["roles"])
+            writer.writerow([item[field] for field in EXPORT_FIELDS])
+        else:
+            buffer.write(json.dumps(item))
+            buffer.write("\n")
+
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router_users.get("/export")
+async def export_users(
+    format: str = Query("ndjson", description="Export format: ndjson or csv"),
+    search: Optional[str] = None,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    created_after: Optional[str] = Query(None, description="ISO 8601 date filter"),
+    created_before: Optional[str] = Query(None, description="ISO 8601 date filter"),
+    user: UserRead = Depends(require_permissions(["user:read"])),
+    db: Session = Depends(get_read_db)
+):
+    if format not in ("ndjson", "csv"):
+        raise APIError(
+            status_code=400,
+            error_code="VAL-001",
+            message=f"User export failed: Unsupported format '{format}'. Use 'ndjson' or 'csv'.",
+        )
+
+    query = _filter_users(
+        as_sync_session(db).query(User).options(selectinload(User.roles)),
+        search, role, is_active, created_after, created_before,
+    ).order_by(User.id)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        # Each chunk is produced next to the session: in the thread pool
+        # for a sync Session, through run_sync for an AsyncSession
+        iterate_in_session(db, _stream_user_export(query, format)),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=users.{format}"},
+    )
+
+
 @router_users.get("/{user_id}")
 def get_user(
     user_id: int, 
     user: UserRead = Depends(require_permissions(["user:read"])),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     found = db.query(User).filter(User.id == user_id).first()
     if not found:
@@ -114,10 +296,7 @@ def get_user(
         for r in found.roles
     ]
     
-    perms = set()
-    for r in found.roles:
-        for p in r.permissions:
-            perms.add(p.name)
+    perms = get_effective_permissions(found)
 
     return {
         "success": True,
@@ -127,7 +306,7 @@ def get_user(
             "name": found.name,
             "is_active": found.is_active,
             "roles": role_details,
-            "permissions": list(perms),
+            "permissions": perms,
             "created_at": found.created_at.isoformat(),
             "updated_at": found.updated_at.isoformat() if found.updated_at else None,
             "last_login": found.last_login.isoformat() if found.last_login else None,
@@ -170,8 +349,12 @@ def create_user(
         new_user.roles = roles
     
     db.add(new_user)
+    db.flush()
+    sync_effective_permissions(db, [new_user.id])
     db.commit()
     db.refresh(new_user)
+    role_catalog.invalidate()
+    get_search_index().upsert(new_user)
 
     return {
         "success": True,
@@ -187,6 +370,214 @@ def create_user(
     }
 
 
+IMPORT_CHUNK_SIZE = 1000
+
+
+async def _iter_import_records(request: Request, import_format: str):
+    """Yield (line_number, record) pairs from a streamed NDJSON or CSV body, one record per line"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    header = None
+    pending = ""
+    line_number = 0
+
+    async def lines():
+        nonlocal pending
+        async for chunk in request.stream():
+            pending += decoder.decode(chunk)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                yield line
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    async for line in lines():
+        line_number += 1
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        if import_format == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip() for h in values]
+                if "email" not in header:
+                    raise APIError(
+                        status_code=400,
+                        error_code="VAL-001",
+                        message="User import failed: The CSV header must include an 'email' column.",
+                    )
+                continue
+            record = dict(zip(header, values))
+            if "roles" in record:
+                record["roles"] = [r for r in record["roles"].split(";") if r]
+            if "is_active" in record:
+                # Blank cells keep the schema default; other values are parsed by the schema
+                record["is_active"] = record["is_active"].strip()
+                if not record["is_active"]:
+                    del record["is_active"]
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+        yield line_number, record
+
+
+def _insert_users(db: Session, rows, role_ids: Dict[str, int], now: datetime) -> Dict[str, int]:
+    """Insert validated (line_number, payload) rows with their roles, uncommitted; returns email -> id"""
+    inserted = db.execute(
+        insert(User).returning(User.id, User.email),
+        [
+            {
+                "email": payload.email,
+                "name": payload.name,
+                "password_hash": payload.password,
+                "is_active": payload.is_active,
+                "created_at": now,
+            }
+            for _, payload in rows
+        ],
+    )
+    ids = {email: user_id for user_id, email in inserted}
+
+    # Unknown role names are ignored, as in create_user
+    assignments = [
+        {"user_id": ids[payload.email], "role_id": role_ids[name]}
+        for _, payload in rows
+        for name in dict.fromkeys(payload.roles)
+        if name in role_ids
+    ]
+    if assignments:
+        db.execute(user_roles.insert(), assignments)
+    sync_effective_permissions(db, ids.values())
+    return ids
+
+
+def _import_chunk(db: Session, records, role_ids: Dict[str, int]) -> List[dict]:
+    """Validate and insert one chunk of import records; returns one result per record"""
+    results = []
+    valid = []
+    seen = set()
+    for line_number, record in records:
+        if not isinstance(record, dict):
+            results.append({
+                "row": line_number, "email": None, "status": "error",
+                "error_code": "VAL-001", "message": "Row is not a valid record",
+            })
+            continue
+        try:
+            payload = UserCreateRequest(**record)
+        except ValidationError as exc:
+            results.append({
+                "row": line_number, "email": record.get("email"), "status": "error",
+                "error_code": "VAL-001",
+                "message": "; ".join(
+                    f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in exc.errors()
+                ),
+            })
+            continue
+        if payload.email in seen:
+            results.append({
+                "row": line_number, "email": payload.email, "status": "error",
+                "error_code": "USER-002", "message": "Duplicate email within the import",
+            })
+            continue
+        seen.add(payload.email)
+        valid.append((line_number, payload))
+
+    existing = set()
+    if seen:
+        existing = {
+            email for (email,) in db.query(User.email).filter(User.email.in_(seen))
+        }
+
+    now = _now()
+    to_insert = []
+    for line_number, payload in valid:
+        if payload.email in existing:
+            results.append({
+                "row": line_number, "email": payload.email, "status": "error",
+                "error_code": "USER-002", "message": "A user with this email already exists",
+            })
+            continue
+        to_insert.append((line_number, payload))
+
+    if to_insert:
+        try:
+            ids = _insert_users(db, to_insert, role_ids, now)
+            db.commit()
+            created = to_insert
+        except IntegrityError:
+            # An email was taken after the existence check (a concurrent
+            # import or create): retry the chunk one row at a time
+            db.rollback()
+            ids, created = {}, []
+            for line_number, payload in to_insert:
+                try:
+                    ids.update(_insert_users(db, [(line_number, payload)], role_ids, now))
+                    db.commit()
+                    created.append((line_number, payload))
+                except IntegrityError:
+                    db.rollback()
+                    results.append({
+                        "row": line_number, "email": payload.email, "status": "error",
+                        "error_code": "USER-002", "message": "A user with this email already exists",
+                    })
+
+        if created:
+            role_catalog.invalidate()
+            index = get_search_index()
+            for line_number, payload in created:
+                index.upsert(User(id=ids[payload.email], name=payload.name, email=payload.email))
+                results.append({
+                    "row": line_number, "email": payload.email, "status": "created",
+                    "id": ids[payload.email],
+                })
+
+    return results
+
+
+@router_users.post("/import")
+async def import_users(
+    request: Request,
+    format: str = Query("ndjson", description="Import format: ndjson or csv"),
+    user: UserRead = Depends(require_permissions(["user:create"])),
+    db: Session = Depends(get_db)
+):
+    if format not in ("ndjson", "csv"):
+        raise APIError(
+            status_code=400,
+            error_code="VAL-001",
+            message=f"User import failed: Unsupported format '{format}'. Use 'ndjson' or 'csv'.",
+        )
+
+    role_ids = await run_db(
+        db, lambda session: {name: role_id for name, role_id in session.query(Role.name, Role.id)}
+    )
+
+    results = []
+    chunk = []
+    async for item in _iter_import_records(request, format):
+        chunk.append(item)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            results.extend(await run_db(db, _import_chunk, chunk, role_ids))
+            chunk = []
+    if chunk:
+        results.extend(await run_db(db, _import_chunk, chunk, role_ids))
+
+    results.sort(key=lambda r: r["row"])
+    created = sum(1 for r in results if r["status"] == "created")
+    return {
+        "success": True,
+        "data": {
+            "created": created,
+            "failed": len(results) - created,
+            "results": results,
+        },
+        "message": f"User import finished: {created} user(s) created, {len(results) - created} row(s) rejected.",
+    }
+
+
 @router_users.put("/{user_id}")
 def update_user(
     user_id: int,
@@ -215,16 +606,29 @@ def update_user(
             )
         found.email = payload.email
     
+    # Deactivation and dropped roles sign the user out, as in
+    # deactivate_user and remove_role_from_user
+    revoke_sessions = False
     if payload.is_active is not None:
+        revoke_sessions = found.is_active and not payload.is_active
         found.is_active = payload.is_active
     
     if payload.roles is not None:
         roles = db.query(Role).filter(Role.name.in_(payload.roles)).all()
+        if {r.id for r in found.roles} - {r.id for r in roles}:
+            revoke_sessions = True
         found.roles = roles
+        sync_effective_permissions(db, [found.id])
 
     found.updated_at = _now()
+    if revoke_sessions:
+        revoke_user_sessions(db, found.id, commit=False)
     db.commit()
     db.refresh(found)
+    session_cache.invalidate_user(found.id)
+    if payload.roles is not None:
+        role_catalog.invalidate()
+    get_search_index().upsert(found)
 
     return {
         "success": True,
@@ -263,7 +667,9 @@ def deactivate_user(
 
     found.is_active = False
     found.updated_at = _now()
+    revoke_user_sessions(db, found.id, commit=False)
     db.commit()
+    session_cache.invalidate_user(found.id)
 
     return {
         "success": True,
@@ -275,7 +681,7 @@ def deactivate_user(
 def get_user_roles(
     user_id: int, 
     user: UserRead = Depends(require_permissions(["user:read"])),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     found = db.query(User).filter(User.id == user_id).first()
     if not found:
@@ -325,7 +731,10 @@ def assign_role_to_user(
     if role not in found.roles:
         found.roles.append(role)
         found.updated_at = _now()
+        sync_effective_permissions(db, [found.id])
         db.commit()
+        session_cache.invalidate_user(found.id)
+        role_catalog.invalidate()
 
     return {
         "success": True,
@@ -352,7 +761,12 @@ def remove_role_from_user(
     if role and role in found.roles:
         found.roles.remove(role)
         found.updated_at = _now()
+        sync_effective_permissions(db, [found.id])
+        # Sessions were granted under the old role set
+        revoke_user_sessions(db, found.id, commit=False)
         db.commit()
+        session_cache.invalidate_user(found.id)
+        role_catalog.invalidate()
 
     return {
         "success": True,
@@ -23,7 +23,7 @@ def get_balance(user: UserRead = Depends(get_current_user)):
         available = 1500.75
         ledger = 1600.75
 
-    logger.info(f"Wallet balance retrieved for user {user.email} (ID: {user.id})")
+    logger.info("Wallet balance retrieved for user %s (ID: %s)", user.email, user.id)
     
     return WalletBalanceResponse(
         currency="SAR",
@@ -68,8 +68,8 @@ def get_transactions(user: UserRead = Depends(get_current_user)):
     ]
     
     logger.info(
-        f"Wallet transactions retrieved for user {user.email} (ID: {user.id}), "
-        f"returned {len(items)} transactions"
+        "Wallet transactions retrieved for user %s (ID: %s), returned %s transactions",
+        user.email, user.id, len(items),
     )
     
     return TransactionListResponse(items=items)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status, Depends
 from typing import Dict, List, Any
 from sqlalchemy.orm import Session
-from ..utils.security import _now, get_session_from_db, create_user_read_from_orm
-from ..database import get_db
+from ..utils.security import _now, resolve_session_user
+from ..database import run_with_app_db
+from ..utils.metrics import metrics
 
 class ConnectionManager:
     def __init__(self):
@@ -29,8 +30,15 @@ class ConnectionManager:
         for user_id in list(self.active_connections.keys()):
             await self.send_personal_message(user_id, message)
 
+    def collect_metrics(self):
+        # Scraped from the thread pool while the loop mutates the dict; list() copies it in one step
+        connections = list(self.active_connections.values())
+        yield ("onenet_websocket_connections", "gauge", "Open WebSocket connections", [((), sum(map(len, connections)))])
+        yield ("onenet_websocket_users", "gauge", "Users with at least one open WebSocket", [((), len(connections))])
+
 
 ws_manager = ConnectionManager()
+metrics.add_collector(ws_manager.collect_metrics)
 
 router_ws = APIRouter(prefix="/ws", tags=["ws"])
 
@@ -44,17 +52,10 @@ async def notifications_ws(websocket: WebSocket):
         return
 
     # Create a temporary DB session for checking auth
-    from ..database import SessionLocal
-    db = SessionLocal()
-    try:
-        session = get_session_from_db(db, session_id)
-        if not session:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-        
-        user = create_user_read_from_orm(session.user)
-    finally:
-        db.close()
+    user = await run_with_app_db(websocket.app, resolve_session_user, session_id)
+    if not user:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
 
     user_id = str(user.id)
 
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from ..utils.permissions import permission_registry
 
 # DTOs renaming to avoid conflict with Models
 
@@ -14,10 +15,19 @@ class UserRead(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
     last_login: Optional[datetime] = None
+    # Effective permissions compiled to a registry bitmask (never serialized)
+    permission_mask: int = Field(0, exclude=True)
+    permissions_version: int = Field(0, exclude=True)
 
     class Config:
         from_attributes = True
 
+    @model_validator(mode="after")
+    def _compile_permission_mask(self):
+        if not self.permission_mask:
+            self.permission_mask = permission_registry.mask(self.permissions)
+        return self
+
 class RoleRead(BaseModel):
     id: int
     name: str
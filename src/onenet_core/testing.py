@@ -0,0 +1,26 @@
+"""Test helpers for applications built on onenet_core."""
+from contextlib import contextmanager
+from typing import Iterator
+
+from .utils.sql_accounting import StatementStats, track_statements
+
+
+@contextmanager
+def assert_max_statements(limit: int) -> Iterator[StatementStats]:
+    """
+    Fail if the block executes more than ``limit`` SQL statements.
+
+    Works around TestClient calls, which run the app in the caller's
+    context::
+
+        with assert_max_statements(3):
+            client.get("/roles")
+
+    The error message lists every statement shape with its count.
+    """
+    with track_statements() as stats:
+        yield stats
+    if stats.count > limit:
+        raise AssertionError(
+            f"{stats.count} SQL statements executed, expected at most {limit}:\n{stats.report()}"
+        )
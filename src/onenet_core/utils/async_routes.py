@@ -0,0 +1,123 @@
+"""Async-session variants of the package routers, used by create_app(async_db=True)."""
+import dataclasses
+import inspect
+from typing import Callable, Dict
+
+from fastapi import APIRouter
+from fastapi.params import Depends
+from fastapi.routing import APIRoute
+
+from ..database import get_db, get_read_db, get_async_db
+
+# Replica routing is sync-only: async reads use the primary AsyncSession
+_SESSION_DEPENDENCIES = (get_db, get_read_db)
+
+_converted: Dict[Callable, Callable] = {}
+
+
+def asyncify(call: Callable) -> Callable:
+    """
+    Return a variant of an endpoint or dependency that takes an AsyncSession.
+
+    ``Depends(get_db)`` and ``Depends(get_read_db)`` parameters become
+    ``Depends(get_async_db)`` and a sync body runs inside
+    ``AsyncSession.run_sync``: it keeps the regular ORM API while the I/O
+    goes through the async driver on the event loop, so no thread pool
+    hand-off is needed. Sub-dependencies are converted recursively;
+    callables that never reach a session dependency are returned as is.
+    Sync callables that only reach one through a sub-dependency become
+    ``async def`` and run on the loop, so their bodies must not block.
+    Async callables that take ``db`` must use ``database.run_db`` for DB work.
+    """
+    if call in _converted:
+        return _converted[call]
+
+    signature = inspect.signature(call)
+    parameters = []
+    db_param = None
+    changed = False
+    for parameter in signature.parameters.values():
+        default = parameter.default
+        if isinstance(default, Depends) and default.dependency is not None:
+            if default.dependency in _SESSION_DEPENDENCIES:
+                db_param = parameter.name
+                parameter = parameter.replace(
+                    default=dataclasses.replace(default, dependency=get_async_db),
+                    annotation=inspect.Parameter.empty,
+                )
+            else:
+                dependency = asyncify(default.dependency)
+                if dependency is not default.dependency:
+                    changed = True
+                    parameter = parameter.replace(
+                        default=dataclasses.replace(default, dependency=dependency)
+                    )
+        parameters.append(parameter)
+
+    if db_param is None and not changed:
+        _converted[call] = call
+        return call
+
+    if inspect.iscoroutinefunction(call):
+        async def converted(**kwargs):
+            return await call(**kwargs)
+    elif db_param is None:
+        # Only its sub-dependencies changed; the body doesn't block (e.g.
+        # require_permissions' mask check), so run it on the loop instead
+        # of paying a thread pool hop per request
+        async def converted(**kwargs):
+            return call(**kwargs)
+    else:
+        async def converted(**kwargs):
+            db = kwargs.pop(db_param)
+            return await db.run_sync(lambda session: call(**kwargs, **{db_param: session}))
+
+    # No __wrapped__: FastAPI would inspect the original callable through it
+    for attribute in ("__module__", "__name__", "__qualname__", "__doc__"):
+        setattr(converted, attribute, getattr(call, attribute, None))
+    converted.__signature__ = signature.replace(parameters=parameters)
+
+    _converted[call] = converted
+    return converted
+
+
+def async_router(router: APIRouter) -> APIRouter:
+    """Copy router with every HTTP route converted by asyncify"""
+    converted = APIRouter()
+    for route in router.routes:
+        if not isinstance(route, APIRoute):
+            # WebSocket routes pick the session kind from app.state themselves
+            converted.routes.append(route)
+            continue
+
+        converted.add_api_route(
+            route.path,
+            asyncify(route.endpoint),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            dependencies=[
+                dataclasses.replace(d, dependency=asyncify(d.dependency))
+                for d in route.dependencies
+            ],
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=route.responses,
+            deprecated=route.deprecated,
+            methods=route.methods,
+            operation_id=route.operation_id,
+            response_model_include=route.response_model_include,
+            response_model_exclude=route.response_model_exclude,
+            response_model_by_alias=route.response_model_by_alias,
+            response_model_exclude_unset=route.response_model_exclude_unset,
+            response_model_exclude_defaults=route.response_model_exclude_defaults,
+            response_model_exclude_none=route.response_model_exclude_none,
+            include_in_schema=route.include_in_schema,
+            response_class=route.response_class,
+            name=route.name,
+            callbacks=route.callbacks,
+            openapi_extra=route.openapi_extra,
+            generate_unique_id_function=route.generate_unique_id_function,
+        )
+    return converted
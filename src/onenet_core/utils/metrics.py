@@ -0,0 +1,205 @@
+"""In-process metrics with Prometheus text exposition for /meta/metrics."""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..database import get_pool_stats
+from .session_cache import session_cache
+
+Labels = Tuple[Tuple[str, str], ...]
+# A collector returns (name, type, help, [(labels, value), ...]) families at scrape time
+Family = Tuple[str, str, str, List[Tuple[Labels, float]]]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = "onenet_http_requests_total"
+HTTP_DURATION = "onenet_http_request_duration_seconds"
+HTTP_IN_FLIGHT = "onenet_http_requests_in_flight"
+API_ERRORS = "onenet_api_errors_total"
+
+
+class _Shard:
+    __slots__ = ("values", "histograms")
+
+    def __init__(self):
+        self.values: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], list] = {}
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms kept in per-thread shards.
+
+    Each thread only ever writes its own shard, so recording takes no
+    lock; a scrape sums the shards. Gauges are counters that also go down.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._descriptions: Dict[str, Tuple[str, str]] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def describe(self, name: str, metric_type: str, help_text: str):
+        self._descriptions[name] = (metric_type, help_text)
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]):
+        """Register a callable that reports gauge families when /meta/metrics is scraped"""
+        self._collectors.append(collector)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1):
+        values = self._shard().values
+        key = (name, labels)
+        values[key] = values.get(key, 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            # Per-bucket (non-cumulative) counts, the +Inf bucket, then the sum
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect.bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def _merged(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        values: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], list] = {}
+        for shard in shards:
+            for key, value in shard.values.copy().items():
+                values[key] = values.get(key, 0) + value
+            for key, histogram in shard.histograms.copy().items():
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = list(histogram)
+                else:
+                    for i, count in enumerate(histogram):
+                        merged[i] += count
+        return values, histograms
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        values, histograms = self._merged()
+        families: Dict[str, List[str]] = {}
+
+        for (name, labels), value in sorted(values.items()):
+            families.setdefault(name, []).append(f"{name}{_labels(labels)} {_number(value)}")
+
+        for (name, labels), histogram in sorted(histograms.items()):
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+            cumulative += histogram[len(self.buckets)]
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(histogram[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                self._descriptions.setdefault(name, (metric_type, help_text))
+                families[name] = [f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples]
+
+        output = []
+        for name, lines in families.items():
+            metric_type, help_text = self._descriptions.get(name, ("untyped", ""))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+metrics = MetricsRegistry()
+metrics.describe(HTTP_REQUESTS, "counter", "HTTP requests by route template, method and status")
+metrics.describe(HTTP_DURATION, "histogram", "HTTP request latency in seconds, until the response is fully sent")
+metrics.describe(HTTP_IN_FLIGHT, "gauge", "HTTP requests currently being served")
+metrics.describe(API_ERRORS, "counter", "Error responses by error_code, as sent by the exception handlers")
+
+
+def record_api_error(error_code: str, status_code: int):
+    metrics.inc(API_ERRORS, (("error_code", error_code), ("status", str(status_code))))
+
+
+def _collect_pool_stats():
+    for role, replica in (("primary", False), ("replica", True)):
+        stats = get_pool_stats(replica=replica)
+        if not stats:
+            continue
+        labels = (("pool", role),)
+        for key in ("size", "checked_in", "checked_out", "overflow"):
+            if key in stats:
+                yield (f"onenet_db_pool_{key}", "gauge", f"Connection pool {key.replace('_', ' ')}", [(labels, stats[key])])
+
+
+def _collect_session_cache():
+    stats = session_cache.stats()
+    for key in ("hits", "misses", "evictions", "expirations"):
+        yield (f"onenet_session_cache_{key}_total", "counter", f"Session cache {key}", [((), stats[key])])
+    yield ("onenet_session_cache_entries", "gauge", "Session cache entries", [((), stats["size"])])
+
+
+metrics.add_collector(_collect_pool_stats)
+metrics.add_collector(_collect_session_cache)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request count, latency and in-flight requests per route template"""
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.inc(HTTP_IN_FLIGHT)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.inc(HTTP_IN_FLIGHT, (), -1)
+            # The router stores the matched route in the shared scope; the
+            # template keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            labels = (("route", route), ("method", scope["method"]))
+            registry.observe(HTTP_DURATION, labels, time.perf_counter() - started)
+            registry.inc(HTTP_REQUESTS, labels + (("status", str(status)),))
@@ -0,0 +1,124 @@
+"""Pure ASGI middleware: request ids, Server-Timing and read-your-writes marking."""
+import itertools
+import random
+import re
+import time
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from ..database import read_your_writes
+from ..logger import request_id_var
+
+_RANDOM_MASK = (1 << 80) - 1
+# Incoming ids are reused only if they look like an id (no header injection, bounded size)
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RequestIdGenerator:
+    """
+    ULID-style ids: 48 bits of Unix milliseconds followed by 80 bits from a
+    per-process random base plus a counter, as 32 hex characters.
+
+    Ids sort by creation time and are strictly increasing within a
+    process; unlike uuid4 no randomness is drawn per id. Hex rather than
+    ULID's base32 keeps it to a single %-format.
+    """
+
+    def __init__(self):
+        self._base = random.getrandbits(80)
+        self._counter = itertools.count()
+
+    def __call__(self) -> str:
+        return "%012x%020x" % (time.time_ns() // 1_000_000, (self._base + next(self._counter)) & _RANDOM_MASK)
+
+
+new_request_id = RequestIdGenerator()
+
+
+class RequestIdMiddleware:
+    """
+    Tags every HTTP and WebSocket connection with a request id.
+
+    The id is taken from a well-formed incoming X-Request-ID header or
+    generated. It is stored on ``request.state.request_id`` and in the log
+    context, and echoed as X-Request-ID on the response (or the WebSocket
+    accept). HTTP responses also get a ``Server-Timing: app;dur=<ms>``
+    header measured up to the response start.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        scope_type = scope["type"]
+        if scope_type not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")
+                if _VALID_REQUEST_ID.fullmatch(incoming):
+                    request_id = incoming
+                break
+        if request_id is None:
+            request_id = new_request_id()
+
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        request_id_header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_with_request_id(message):
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                duration_ms = (time.perf_counter() - started) * 1000
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    request_id_header,
+                    (b"server-timing", b"app;dur=%.3f" % duration_ms),
+                ]
+            elif message_type == "websocket.accept":
+                message["headers"] = [*message.get("headers", ()), request_id_header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+
+
+def _session_cookie(cookie_header: str) -> Optional[str]:
+    cookie = SimpleCookie()
+    try:
+        cookie.load(cookie_header)
+    except Exception:
+        return None
+    morsel = cookie.get("session_id")
+    return morsel.value if morsel else None
+
+
+class ReadYourWritesMiddleware:
+    """After a successful write, pin the caller's session (old and newly issued) to the primary"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_mark(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                for name, value in scope["headers"]:
+                    if name == b"cookie":
+                        read_your_writes.mark(_session_cookie(value.decode("latin-1")))
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"set-cookie" and value.startswith(b"session_id="):
+                        read_your_writes.mark(_session_cookie(value.decode("latin-1")))
+            await send(message)
+
+        await self.app(scope, receive, send_and_mark)
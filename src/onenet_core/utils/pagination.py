@@ -0,0 +1,31 @@
+"""Opaque cursors for keyset pagination."""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, last_id: int) -> str:
+    """Encode the position after the last returned row as an opaque string"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {"s": sort_by, "o": sort_order, "v": value, "id": last_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(payload, dict) or not isinstance(payload.get("id"), int):
+        raise ValueError("Malformed cursor")
+    return payload
@@ -0,0 +1,109 @@
+"""Permission registry and materialized effective-permission helpers."""
+import threading
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, delete, insert, update
+from sqlalchemy.orm import Session
+from ..models.user import User, Permission, user_roles, role_permissions, user_effective_permissions
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PermissionRegistry:
+    """
+    Assigns every permission name a stable, process-local bit index.
+
+    Permission sets are then represented as integer masks so a permission
+    check is a single AND instead of a set lookup per required permission.
+    """
+
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+
+    def bit(self, name: str) -> int:
+        """Return the mask bit for a permission name, registering it if new"""
+        index = self._bits.get(name)
+        if index is None:
+            with self._lock:
+                index = self._bits.get(name)
+                if index is None:
+                    index = len(self._names)
+                    self._names.append(name)
+                    self._bits[name] = index
+        return 1 << index
+
+    def mask(self, names: Iterable[str]) -> int:
+        """Compile a collection of permission names into a mask"""
+        result = 0
+        for name in names:
+            result |= self.bit(name)
+        return result
+
+    def names(self, mask: int) -> List[str]:
+        """Expand a mask back into permission names"""
+        return [name for index, name in enumerate(self._names) if mask >> index & 1]
+
+    def register_all(self, db):
+        """
+        Give every Permission row a bit, in id order; run at startup.
+
+        Names already compiled into route masks keep their bits.
+        """
+        for (name,) in db.query(Permission.name).order_by(Permission.id):
+            self.bit(name)
+
+
+permission_registry = PermissionRegistry()
+
+
+def preload_permission_bits(db: Session):
+    """
+    Startup hook: register_all, logging instead of failing when the
+    permissions table cannot be read (unreachable or unmigrated database).
+    Bits are otherwise assigned as permissions are first used.
+    """
+    try:
+        permission_registry.register_all(db)
+    except Exception:
+        db.rollback()
+        logger.warning("Permission bits not preloaded; they are assigned on first use", exc_info=True)
+
+
+def sync_effective_permissions(db: Session, user_ids: Optional[Iterable[int]] = None):
+    """
+    Rematerialize user_effective_permissions and bump permissions_version.
+
+    Runs inside the caller's transaction; call it after changing a user's
+    roles (or a role's permissions) and before committing. With no
+    user_ids every user is rebuilt, which doubles as a backfill.
+    """
+    db.flush()
+
+    closure = (
+        select(user_roles.c.user_id, role_permissions.c.permission_id)
+        .join(role_permissions, role_permissions.c.role_id == user_roles.c.role_id)
+        .distinct()
+    )
+    clear = delete(user_effective_permissions)
+    bump = update(User).values(permissions_version=User.permissions_version + 1)
+
+    if user_ids is not None:
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return
+        closure = closure.where(user_roles.c.user_id.in_(user_ids))
+        clear = clear.where(user_effective_permissions.c.user_id.in_(user_ids))
+        bump = bump.where(User.id.in_(user_ids))
+
+    db.execute(clear)
+    db.execute(
+        insert(user_effective_permissions).from_select(["user_id", "permission_id"], closure)
+    )
+    db.execute(bump.execution_options(synchronize_session=False))
+
+    # Drop stale state on any instances already loaded in this session
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, User) and (user_ids is None or obj.id in user_ids):
+            db.expire(obj, ["permissions_version", "effective_permissions"])
@@ -0,0 +1,154 @@
+"""Versioned RBAC catalog backing GET /roles and GET /permissions."""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+
+from ..models.user import Role, Permission, User, user_roles
+from ..config import ROLE_CATALOG_CACHE_SECONDS, READ_YOUR_WRITES_SECONDS
+from ..database import is_replica_session
+
+
+def load_roles(db: Session) -> List[Dict[str, Any]]:
+    """
+    Build the /roles payload: one query for the roles, one batched load of
+    their permissions and one GROUP BY for the user counts.
+    """
+    roles = db.query(Role).options(selectinload(Role.permissions)).all()
+    counts = dict(db.execute(
+        select(user_roles.c.role_id, func.count())
+        .select_from(user_roles.join(User.__table__, User.id == user_roles.c.user_id))
+        .group_by(user_roles.c.role_id)
+    ).all())
+
+    return [
+        {
+            "id": role.id,
+            "name": role.name,
+            "description": role.description,
+            "permissions": [
+                {"id": p.id, "name": p.name, "description": p.description}
+                for p in role.permissions
+            ],
+            "user_count": counts.get(role.id, 0),
+        }
+        for role in roles
+    ]
+
+
+def load_permissions(db: Session) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": p.id,
+            "name": p.name,
+            "description": p.description,
+            "category": p.category,
+        }
+        for p in db.query(Permission).all()
+    ]
+
+
+def _serialize(payload: Dict[str, Any]) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Pre-serialized /roles and /permissions responses at one catalog version"""
+    version: int
+    roles_body: bytes
+    roles_etag: str
+    permissions_body: bytes
+    permissions_etag: str
+
+
+class RoleCatalog:
+    """
+    Process-local snapshot of roles, permissions and their mappings.
+
+    Invalidated by role creation and role assignment changes in this
+    process; the TTL bounds how stale other workers can be (0 rebuilds it
+    on every request). ``version`` increases each time a rebuild produces
+    different content. ETags are content hashes, so they agree across
+    workers whatever their version. For ``lag_seconds`` after an
+    invalidation, snapshots read from the replica are served but not
+    cached, since the replica may not have the change yet.
+    """
+
+    def __init__(self, ttl_seconds: int = ROLE_CATALOG_CACHE_SECONDS, lag_seconds: int = READ_YOUR_WRITES_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.lag_seconds = lag_seconds
+        self.version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._last: Optional[CatalogSnapshot] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._invalidated_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, db: Session) -> CatalogSnapshot:
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() < self._expires_at:
+                return self._snapshot
+            generation = self._generation
+
+        roles_body = _serialize({"success": True, "data": {"roles": load_roles(db)}})
+        permissions_body = _serialize({"success": True, "data": {"permissions": load_permissions(db)}})
+
+        with self._lock:
+            last = self._last
+            if last is not None and (last.roles_body, last.permissions_body) == (roles_body, permissions_body):
+                snapshot = last
+            else:
+                self.version += 1
+                snapshot = CatalogSnapshot(
+                    version=self.version,
+                    roles_body=roles_body,
+                    roles_etag=_etag(roles_body),
+                    permissions_body=permissions_body,
+                    permissions_etag=_etag(permissions_body),
+                )
+                self._last = snapshot
+            # Don't cache a load that raced with an invalidation or may predate it
+            stale = (
+                is_replica_session(db)
+                and self._invalidated_at is not None
+                and time.monotonic() - self._invalidated_at < self.lag_seconds
+            )
+            if self.ttl_seconds > 0 and generation == self._generation and not stale:
+                self._snapshot = snapshot
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            self._snapshot = None
+
+
+role_catalog = RoleCatalog()
+
+
+def catalog_response(request: Request, body: bytes, etag: str, version: int) -> Response:
+    """Serve a pre-serialized catalog body, or 304 if the client's If-None-Match already has it"""
+    headers = {"ETag": etag, "X-Catalog-Version": str(version), "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in tags or etag in tags or f"W/{etag}" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,200 @@
+"""Pluggable substring search backends for the users directory."""
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import Integer, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models.user import User
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class UserSearchIndex:
+    """
+    Base search backend.
+
+    ``clause`` receives the same ``%term%`` pattern list_users has always
+    used and returns a filter on ``User``; the base implementation is the
+    original ILIKE scan. Backends must match exactly the same rows.
+    """
+
+    name = "ilike"
+
+    def install(self, conn: Connection):
+        """Create any supporting database objects (idempotent)"""
+
+    def clause(self, pattern: str):
+        return User.name.ilike(pattern) | User.email.ilike(pattern)
+
+    def upsert(self, user: User):
+        """Called after a user is created or updated"""
+
+    def remove(self, user_id: int):
+        """Called after a user is deleted"""
+
+
+class PostgresTrigramIndex(UserSearchIndex):
+    """pg_trgm GIN indexes let Postgres serve the unchanged ILIKE filter from an index"""
+
+    name = "pg_trgm"
+
+    def install(self, conn: Connection):
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_users_name_trgm "
+            "ON users USING gin (name gin_trgm_ops)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_users_email_trgm "
+            "ON users USING gin (email gin_trgm_ops)"
+        ))
+
+
+class SqliteFts5Index(UserSearchIndex):
+    """
+    External-content FTS5 table with the trigram tokenizer (SQLite >= 3.34).
+
+    Triggers keep ``users_fts`` in sync with ``users``. Trigram FTS5 tables
+    answer case-insensitive LIKE from the index. The index only agrees
+    with ILIKE for ASCII terms with at least one three-character run
+    between wildcards, so every other term takes the ILIKE scan.
+    """
+
+    name = "fts5"
+
+    _DDL = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+        "name, email, content='users', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+        "INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email); END",
+        "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, name, email) "
+        "VALUES ('delete', old.id, old.name, old.email); END",
+        "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF name, email ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, name, email) "
+        "VALUES ('delete', old.id, old.name, old.email); "
+        "INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email); END",
+    )
+
+    def install(self, conn: Connection):
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+        )).first()
+        for statement in self._DDL:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+
+    def clause(self, pattern: str):
+        # Shorter runs aren't indexed, and non-ASCII case folding differs from ILIKE
+        if not pattern.isascii() or max(map(len, _WILDCARDS.split(pattern))) < 3:
+            return super().clause(pattern)
+        matches = text(
+            "SELECT rowid FROM users_fts WHERE name LIKE :pattern "
+            "UNION SELECT rowid FROM users_fts WHERE email LIKE :pattern"
+        ).bindparams(pattern=pattern).columns(rowid=Integer)
+        return User.id.in_(matches)
+
+
+class InMemorySearchIndex(UserSearchIndex):
+    """
+    Process-local index holding lowercased name/email per user id.
+
+    Only suitable for small directories on a single node: the matching ids
+    are handed to the query as an unbounded IN list, and other workers'
+    writes are not seen. Never selected automatically; install it with
+    set_search_index() after load().
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._rows: Dict[int, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        rows = {
+            user_id: ((name or "").lower(), (email or "").lower())
+            for user_id, name, email in db.query(User.id, User.name, User.email)
+        }
+        with self._lock:
+            self._rows = rows
+
+    def clause(self, pattern: str):
+        regex = _like_to_regex(pattern.lower())
+        with self._lock:
+            ids = [
+                user_id for user_id, (name, email) in self._rows.items()
+                if regex.match(name) or regex.match(email)
+            ]
+        return User.id.in_(ids)
+
+    def upsert(self, user: User):
+        with self._lock:
+            self._rows[user.id] = ((user.name or "").lower(), (user.email or "").lower())
+
+    def remove(self, user_id: int):
+        with self._lock:
+            self._rows.pop(user_id, None)
+
+
+_WILDCARDS = re.compile(r"[%_]")
+
+
+def _like_to_regex(pattern: str):
+    parts = []
+    for char in pattern:
+        if char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts) + r"\Z", re.DOTALL)
+
+
+_search_index: UserSearchIndex = UserSearchIndex()
+
+
+def get_search_index() -> UserSearchIndex:
+    return _search_index
+
+
+def set_search_index(index: Optional[UserSearchIndex]):
+    """Select the active backend (None restores the plain ILIKE scan)"""
+    global _search_index
+    _search_index = index or UserSearchIndex()
+
+
+def install_search_index(db: Session) -> UserSearchIndex:
+    """
+    Pick the best backend for the session's dialect, install and activate it.
+
+    Postgres gets pg_trgm, SQLite gets FTS5 when the trigram tokenizer is
+    available; anything else (or a failed install) keeps the ILIKE scan.
+    Called at startup when SEARCH_INDEX=auto.
+    """
+    dialect = db.get_bind().dialect
+    index: UserSearchIndex
+    if dialect.name == "postgresql":
+        index = PostgresTrigramIndex()
+    elif dialect.name == "sqlite" and dialect.dbapi.sqlite_version_info >= (3, 34, 0):
+        index = SqliteFts5Index()
+    else:
+        index = UserSearchIndex()
+
+    try:
+        index.install(db.connection())
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.warning("User search index %s could not be installed; using ILIKE", index.name, exc_info=True)
+        index = UserSearchIndex()
+
+    set_search_index(index)
+    logger.info("User search index installed: %s (%s)", index.name, dialect.name)
+    return index
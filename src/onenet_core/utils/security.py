@@ -1,25 +1,40 @@
-from datetime import datetime, timedelta
-from typing import Optional
-from uuid import uuid4
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload
 from ..models.session import Session as SessionModel
 from ..models.user import User
 from ..schemas import UserRead
-from ..config import SESSION_TTL_SECONDS
 from ..logger import get_logger, mask_session_id
+from .session_cache import session_cache
+from .session_store import SqlSessionStore, get_session_store
+from .write_behind import write_behind
 
 logger = get_logger(__name__)
 
+# Loads user -> roles / effective permissions in a single statement
+USER_GRAPH_OPTIONS = (
+    joinedload(User.roles),
+    joinedload(User.effective_permissions),
+)
+
 def _now() -> datetime:
     return datetime.utcnow()
 
-def create_user_read_from_orm(user: User) -> UserRead:
-    """Convert SQLAlchemy User to Pydantic UserRead"""
-    role_names = [r.name for r in user.roles]
+def get_effective_permissions(user: User) -> List[str]:
+    """Permission names granted to user through its roles"""
+    if user.permissions_version:
+        return [p.name for p in user.effective_permissions]
+
+    # Not materialized yet (e.g. roles seeded outside sync_effective_permissions)
     perms = set()
     for r in user.roles:
         for p in r.permissions:
             perms.add(p.name)
+    return list(perms)
+
+def create_user_read_from_orm(user: User) -> UserRead:
+    """Convert SQLAlchemy User to Pydantic UserRead"""
+    role_names = [r.name for r in user.roles]
     
     return UserRead(
         id=user.id,
@@ -27,74 +42,107 @@ def create_user_read_from_orm(user: User) -> UserRead:
         name=user.name,
         is_active=user.is_active,
         roles=role_names,
-        permissions=list(perms),
+        permissions=get_effective_permissions(user),
+        permissions_version=user.permissions_version or 0,
         created_at=user.created_at,
         updated_at=user.updated_at,
         last_login=user.last_login
     )
 
-def create_session_for_user(db: Session, user: User) -> str:
-    """Create a new session for user in DB"""
-    session_id = str(uuid4())
-    expires = _now() + timedelta(seconds=SESSION_TTL_SECONDS)
-    
-    db_session = SessionModel(
-        session_id=session_id,
-        user_id=user.id,
-        expires_at=expires
-    )
-    db.add(db_session)
-    db.commit()
+def create_session_for_user(db: Session, user: User, commit: bool = True) -> str:
+    """
+    Create a new session for user in the active session store.
+
+    Pass commit=False to leave the session row in the caller's unit of
+    work; the caller is then responsible for committing. Stores that do
+    not keep sessions in the database ignore it.
+    """
+    stored = get_session_store().create(db, user, commit=commit)
     
     logger.info(
-        f"Session created for user {user.email} (ID: {user.id}). "
-        f"Session: {mask_session_id(session_id)}, Expires: {expires}"
+        "Session created for user %s (ID: %s). Session: %s, Expires: %s",
+        user.email, user.id, mask_session_id(stored.session_id), stored.expires_at,
     )
     
-    return session_id
+    return stored.session_id
 
 def get_session_from_db(db: Session, session_id: Optional[str]) -> Optional[SessionModel]:
-    """Get session from DB, delete if expired"""
+    """Get session from DB; expired sessions are a miss (the sweeper deletes them)"""
     if not session_id:
         logger.debug("Session lookup failed: No session_id provided")
         return None
     
-    logger.debug(f"Looking up session: {mask_session_id(session_id)}")
-    
-    session = db.query(SessionModel).filter(SessionModel.session_id == session_id).first()
-    if not session:
-        logger.warning(f"Session not found in database: {mask_session_id(session_id)}")
-        return None
-    
-    if session.expires_at < _now():
-        logger.warning(
-            f"Session expired: {mask_session_id(session_id)} "
-            f"(User: {session.user.email}, Expired at: {session.expires_at}). Deleting from database."
-        )
-        db.delete(session)
-        db.commit()
-        return None
-    
-    logger.debug(
-        f"Session found and valid: {mask_session_id(session_id)} "
-        f"(User: {session.user.email}, Expires: {session.expires_at})"
-    )
-    
-    return session
+    return SqlSessionStore().get_row(db, session_id)
 
 def delete_session_from_db(db: Session, session_id: Optional[str]):
-    """Delete session from DB"""
+    """Delete session from the active session store"""
     if not session_id:
         logger.debug("Session deletion skipped: No session_id provided")
         return
     
-    session = db.query(SessionModel).filter(SessionModel.session_id == session_id).first()
-    if session:
-        logger.info(
-            f"Session deleted: {mask_session_id(session_id)} "
-            f"(User: {session.user.email})"
-        )
-        db.delete(session)
-        db.commit()
+    session_cache.invalidate(session_id)
+    if get_session_store().delete(db, session_id):
+        logger.info("Session deleted: %s", mask_session_id(session_id))
     else:
-        logger.debug(f"Session deletion failed: Session not found {mask_session_id(session_id)}")
+        logger.debug("Session deletion failed: Session not found %s", mask_session_id(session_id))
+
+def revoke_user_sessions(db: Session, user_id: int, commit: bool = True) -> int:
+    """
+    Revoke every session of a user and evict their cached principals.
+
+    Pass commit=False to make the revocation part of the caller's unit of
+    work; the caller then commits and evicts again with
+    session_cache.invalidate_user, so no principal cached in between survives.
+    """
+    revoked = get_session_store().delete_for_user(db, user_id, commit=commit)
+    session_cache.invalidate_user(user_id)
+    logger.info("Revoked all sessions for user ID %s (%s removed)", user_id, revoked)
+    return revoked
+
+def resolve_session_user(db: Session, session_id: Optional[str]) -> Optional[UserRead]:
+    """
+    Resolve a session cookie to a principal, or None if it is invalid.
+
+    Cached principals are served without touching the database; the
+    store's in-process verify() (token signature and revocation) still
+    runs first. On a miss the session comes from the store and the user
+    graph from the database, unless the store already loaded it.
+    """
+    if not session_id:
+        return None
+
+    store = get_session_store()
+    if not store.verify(db, session_id):
+        return None
+
+    user = session_cache.get(session_id)
+    if user is not None:
+        if store.tracks_last_seen:
+            write_behind.touch_session(session_id)
+        return user
+
+    stored = store.get(db, session_id)
+    if stored is None:
+        return None
+
+    db_user = stored.user
+    if db_user is None:
+        # Sessions kept outside the database: load the user graph by id
+        db_user = (
+            db.query(User)
+            .options(*USER_GRAPH_OPTIONS)
+            .filter(User.id == stored.user_id)
+            .first()
+        )
+
+    # Checked for every store, including the SQL store that loads the user itself
+    if not db_user or not db_user.is_active:
+        return None
+    # A token issued under an older permissions_version stays valid, as DB
+    # sessions do: the principal is built from the graph just loaded
+
+    user = create_user_read_from_orm(db_user)
+    session_cache.put(session_id, user, stored.expires_at)
+    if store.tracks_last_seen:
+        write_behind.touch_session(session_id)
+    return user
@@ -0,0 +1,119 @@
+"""In-process TTL/LRU cache of resolved sessions (session_id -> UserRead)."""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from ..schemas import UserRead
+from ..config import SESSION_CACHE_MAX_ENTRIES, SESSION_CACHE_TTL_SECONDS
+
+
+class SessionCache:
+    """
+    Bounded LRU cache of authenticated principals keyed by session id.
+
+    Entries live for at most ``ttl_seconds`` and never outlive the session's
+    own ``expires_at``. A ``max_entries`` of 0 disables the cache.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[UserRead, float]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, session_id: str) -> Optional[UserRead]:
+        """Return the cached principal for session_id, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, deadline = entry
+            if deadline <= time.monotonic():
+                self._remove(session_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return user
+
+    def put(self, session_id: str, user: UserRead, expires_at: Optional[datetime] = None):
+        """Cache a resolved principal until the TTL or the session expiry, whichever is first"""
+        if not self.enabled:
+            return
+        ttl = float(self.ttl_seconds)
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+            self._entries[session_id] = (user, time.monotonic() + ttl)
+            self._by_user.setdefault(user.id, set()).add(session_id)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, session_id: Optional[str]):
+        """Drop a single session from the cache"""
+        if not session_id:
+            return
+        with self._lock:
+            self._remove(session_id)
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached session belonging to user_id"""
+        with self._lock:
+            for session_id in list(self._by_user.get(user_id, ())):
+                self._remove(session_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the cache counters"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, session_id: str):
+        # Caller must hold the lock
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        user_id = entry[0].id
+        sessions = self._by_user.get(user_id)
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._by_user[user_id]
+
+
+session_cache = SessionCache(
+    max_entries=SESSION_CACHE_MAX_ENTRIES,
+    ttl_seconds=SESSION_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,441 @@
+"""Pluggable session storage backends."""
+import abc
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session, joinedload
+
+from ..models.session import Session as SessionModel, SessionRevocation
+from ..models.user import User
+from ..config import SESSION_TTL_SECONDS, SESSION_MODE, SESSION_SWEEP_BATCH_SIZE
+from ..logger import get_logger, mask_session_id
+from .tokens import encode_session_token, decode_session_token, revocation_list
+
+logger = get_logger(__name__)
+
+# Loads session -> user -> roles / effective permissions in a single statement
+AUTH_GRAPH_OPTIONS = (
+    joinedload(SessionModel.user).joinedload(User.roles),
+    joinedload(SessionModel.user).joinedload(User.effective_permissions),
+)
+
+
+@dataclass
+class StoredSession:
+    session_id: str
+    user_id: int
+    expires_at: datetime
+    # Stores that can fetch the user graph together with the session set this
+    user: Optional[User] = None
+
+
+class SessionStore(abc.ABC):
+    """
+    Interface for session storage.
+
+    ``db`` is always the request's SQLAlchemy session; backends that keep
+    sessions elsewhere simply ignore it.
+    """
+
+    name = "base"
+    # Whether sessions have a last_seen_at column for write_behind to update
+    tracks_last_seen = False
+
+    @abc.abstractmethod
+    def create(self, db: Session, user: User, commit: bool = True) -> StoredSession:
+        """Start a session for user"""
+
+    def verify(self, db: Session, session_id: str) -> bool:
+        """Cheap in-process check run before the principal cache is consulted"""
+        return True
+
+    @abc.abstractmethod
+    def get(self, db: Session, session_id: str) -> Optional[StoredSession]:
+        """Return the live session, or None if it is unknown or expired"""
+
+    @abc.abstractmethod
+    def delete(self, db: Session, session_id: str) -> bool:
+        """Remove a session; returns True if one existed"""
+
+    @abc.abstractmethod
+    def delete_for_user(self, db: Session, user_id: int, commit: bool = True) -> int:
+        """
+        Remove every session of user_id; returns how many were removed (if known).
+
+        With commit=False database-backed removals join the caller's transaction.
+        """
+
+    def purge_expired(self, db: Session, batch_size: int = SESSION_SWEEP_BATCH_SIZE) -> int:
+        """Remove expired state; called by the background sweeper"""
+        return 0
+
+
+def _new_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=SESSION_TTL_SECONDS)
+
+
+class SqlSessionStore(SessionStore):
+    """Sessions in the ``sessions`` table (the default)"""
+
+    name = "sql"
+    tracks_last_seen = True
+
+    def create(self, db: Session, user: User, commit: bool = True) -> StoredSession:
+        stored = StoredSession(session_id=str(uuid4()), user_id=user.id, expires_at=_new_expiry())
+        db.add(SessionModel(
+            session_id=stored.session_id,
+            user_id=stored.user_id,
+            expires_at=stored.expires_at,
+        ))
+        if commit:
+            db.commit()
+        return stored
+
+    def get_row(self, db: Session, session_id: str) -> Optional[SessionModel]:
+        """Load the session row together with the user's auth graph"""
+        logger.debug("Looking up session: %s", mask_session_id(session_id))
+
+        session = (
+            db.query(SessionModel)
+            .options(*AUTH_GRAPH_OPTIONS)
+            .filter(SessionModel.session_id == session_id)
+            .first()
+        )
+        if not session:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Session not found in database: %s", mask_session_id(session_id))
+            return None
+
+        if session.expires_at < datetime.utcnow():
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Session expired: %s (User: %s, Expired at: %s)",
+                    mask_session_id(session_id), session.user.email, session.expires_at,
+                )
+            return None
+
+        logger.debug(
+            "Session found and valid: %s (User: %s, Expires: %s)",
+            mask_session_id(session_id), session.user.email, session.expires_at,
+        )
+
+        return session
+
+    def get(self, db: Session, session_id: str) -> Optional[StoredSession]:
+        row = self.get_row(db, session_id)
+        if row is None:
+            return None
+        return StoredSession(row.session_id, row.user_id, row.expires_at, user=row.user)
+
+    def delete(self, db: Session, session_id: str) -> bool:
+        session = db.query(SessionModel).filter(SessionModel.session_id == session_id).first()
+        if not session:
+            return False
+        db.delete(session)
+        db.commit()
+        return True
+
+    def delete_for_user(self, db: Session, user_id: int, commit: bool = True) -> int:
+        # Single DELETE served by the sessions.user_id index
+        result = db.execute(
+            delete(SessionModel)
+            .where(SessionModel.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
+        if commit:
+            db.commit()
+        return result.rowcount
+
+    def purge_expired(self, db: Session, batch_size: int = SESSION_SWEEP_BATCH_SIZE) -> int:
+        return delete_expired_sessions(db, batch_size)
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local sessions for single-node deployments and tests"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._sessions: Dict[str, StoredSession] = {}
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, db: Session, user: User, commit: bool = True) -> StoredSession:
+        stored = StoredSession(session_id=str(uuid4()), user_id=user.id, expires_at=_new_expiry())
+        with self._lock:
+            self._sessions[stored.session_id] = stored
+            self._by_user.setdefault(stored.user_id, set()).add(stored.session_id)
+        return stored
+
+    def get(self, db: Session, session_id: str) -> Optional[StoredSession]:
+        stored = self._sessions.get(session_id)
+        if stored is None or stored.expires_at < datetime.utcnow():
+            return None
+        return stored
+
+    def delete(self, db: Session, session_id: str) -> bool:
+        with self._lock:
+            return self._remove(session_id)
+
+    def delete_for_user(self, db: Session, user_id: int, commit: bool = True) -> int:
+        with self._lock:
+            session_ids = self._by_user.pop(user_id, set())
+            for session_id in session_ids:
+                self._sessions.pop(session_id, None)
+        return len(session_ids)
+
+    def purge_expired(self, db: Session, batch_size: int = SESSION_SWEEP_BATCH_SIZE) -> int:
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [sid for sid, stored in self._sessions.items() if stored.expires_at < now]
+            for session_id in expired:
+                self._remove(session_id)
+        return len(expired)
+
+    def _remove(self, session_id: str) -> bool:
+        # Caller must hold the lock
+        stored = self._sessions.pop(session_id, None)
+        if stored is None:
+            return False
+        session_ids = self._by_user.get(stored.user_id)
+        if session_ids is not None:
+            session_ids.discard(session_id)
+            if not session_ids:
+                del self._by_user[stored.user_id]
+        return True
+
+
+class InMemoryKeyValueClient:
+    """
+    Local stand-in for the subset of the Redis client API the KV store uses
+    (get / set with ex / delete / sadd / srem / smembers / expire), for
+    development and tests.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, deadline = item
+            if deadline is not None and deadline <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value, ex: Optional[int] = None):
+        deadline = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._data[key] = (value, deadline)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def sadd(self, key: str, *members) -> int:
+        with self._lock:
+            value, deadline = self._data.get(key, (set(), None))
+            added = len(set(members) - value)
+            value.update(members)
+            self._data[key] = (value, deadline)
+            return added
+
+    def srem(self, key: str, *members) -> int:
+        with self._lock:
+            value, _ = self._data.get(key, (set(), None))
+            removed = len(value & set(members))
+            value.difference_update(members)
+            return removed
+
+    def smembers(self, key: str) -> Set:
+        members = self.get(key)
+        return set(members) if members else set()
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            value, _ = self._data[key]
+            self._data[key] = (value, time.monotonic() + seconds)
+            return True
+
+
+class KeyValueSessionStore(SessionStore):
+    """
+    Sessions in a key-value store with native expiry (e.g. Redis).
+
+    ``client`` needs Redis-style ``get``, ``set(key, value, ex=...)``,
+    ``delete`` and the set commands used for the per-user index; the
+    store's TTL does the expiry, so no sweeping is needed.
+    """
+
+    name = "kv"
+
+    def __init__(self, client=None, prefix: str = "onenet:session:"):
+        self.client = client if client is not None else InMemoryKeyValueClient()
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    def create(self, db: Session, user: User, commit: bool = True) -> StoredSession:
+        stored = StoredSession(session_id=str(uuid4()), user_id=user.id, expires_at=_new_expiry())
+        value = json.dumps({"user_id": stored.user_id, "expires_at": stored.expires_at.isoformat()})
+        self.client.set(self._key(stored.session_id), value, ex=SESSION_TTL_SECONDS)
+        user_key = self._user_key(stored.user_id)
+        self.client.sadd(user_key, stored.session_id)
+        self.client.expire(user_key, SESSION_TTL_SECONDS)
+        return stored
+
+    def get(self, db: Session, session_id: str) -> Optional[StoredSession]:
+        raw = self.client.get(self._key(session_id))
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        data = json.loads(raw)
+        expires_at = datetime.fromisoformat(data["expires_at"])
+        if expires_at < datetime.utcnow():
+            return None
+        return StoredSession(session_id, data["user_id"], expires_at)
+
+    def delete(self, db: Session, session_id: str) -> bool:
+        stored = self.get(db, session_id)
+        if stored is not None:
+            self.client.srem(self._user_key(stored.user_id), session_id)
+        return bool(self.client.delete(self._key(session_id)))
+
+    def delete_for_user(self, db: Session, user_id: int, commit: bool = True) -> int:
+        user_key = self._user_key(user_id)
+        session_ids = [
+            m.decode() if isinstance(m, bytes) else m for m in self.client.smembers(user_key)
+        ]
+        removed = self.client.delete(*[self._key(sid) for sid in session_ids]) if session_ids else 0
+        self.client.delete(user_key)
+        return removed
+
+
+class TokenSessionStore(SessionStore):
+    """Stateless HMAC-signed tokens checked against the revocation list"""
+
+    name = "token"
+
+    def create(self, db: Session, user: User, commit: bool = True) -> StoredSession:
+        token = encode_session_token(user.id, user.permissions_version or 0)
+        claims = decode_session_token(token)
+        return StoredSession(token, user.id, claims.expires_at)
+
+    def verify(self, db: Session, session_id: str) -> bool:
+        claims = decode_session_token(session_id)
+        if claims is None:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Session token invalid or expired: %s", mask_session_id(session_id))
+            return False
+        revocation_list.refresh(db)
+        if revocation_list.is_revoked(claims):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Session token revoked: %s", mask_session_id(session_id))
+            return False
+        return True
+
+    def get(self, db: Session, session_id: str) -> Optional[StoredSession]:
+        if not self.verify(db, session_id):
+            return None
+        claims = decode_session_token(session_id)
+        return StoredSession(session_id, claims.user_id, claims.expires_at)
+
+    def delete(self, db: Session, session_id: str) -> bool:
+        claims = decode_session_token(session_id)
+        if claims is None:
+            return False
+        revocation_list.revoke_token(db, claims)
+        return True
+
+    def delete_for_user(self, db: Session, user_id: int, commit: bool = True) -> int:
+        # One user-wide revocation entry covers every outstanding token
+        revocation_list.revoke_user(db, user_id, commit=commit)
+        return 0
+
+    def purge_expired(self, db: Session, batch_size: int = SESSION_SWEEP_BATCH_SIZE) -> int:
+        return delete_expired_revocations(db)
+
+
+def delete_expired_sessions(
+    db: Session,
+    batch_size: int = SESSION_SWEEP_BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Delete expired sessions in batches of at most batch_size rows.
+
+    Each batch is its own short transaction, found through the
+    expires_at index. Returns the number of deleted sessions.
+    """
+    now = now or datetime.utcnow()
+    deleted = 0
+    while True:
+        expired = [
+            session_id
+            for (session_id,) in db.query(SessionModel.session_id)
+            .filter(SessionModel.expires_at < now)
+            .limit(batch_size)
+        ]
+        if not expired:
+            break
+        db.execute(
+            delete(SessionModel)
+            .where(SessionModel.session_id.in_(expired))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        deleted += len(expired)
+        if len(expired) < batch_size:
+            break
+    return deleted
+
+
+def delete_expired_revocations(db: Session, now: Optional[datetime] = None) -> int:
+    """Purge revocation entries whose tokens have all expired"""
+    now = now or datetime.utcnow()
+    result = db.execute(
+        delete(SessionRevocation)
+        .where(SessionRevocation.expires_at < now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+_STORES_BY_MODE = {
+    "db": SqlSessionStore,
+    "memory": MemorySessionStore,
+    "kv": KeyValueSessionStore,
+    "token": TokenSessionStore,
+}
+
+_session_store: SessionStore = _STORES_BY_MODE.get(SESSION_MODE, SqlSessionStore)()
+
+
+def get_session_store() -> SessionStore:
+    return _session_store
+
+
+def set_session_store(store: SessionStore):
+    """Install a session backend, e.g. KeyValueSessionStore(redis.Redis(...))"""
+    global _session_store
+    _session_store = store
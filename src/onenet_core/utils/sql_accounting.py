@@ -0,0 +1,158 @@
+"""Per-request SQL statement counting and N+1 detection (opt-in, see SQL_ACCOUNTING)."""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import SQL_N_PLUS_ONE_THRESHOLD
+from ..logger import get_logger, log_sampler
+
+logger = get_logger(__name__)
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+class StatementStats:
+    """
+    Statements executed while tracking is active.
+
+    ``shapes`` counts each distinct SQL string. Parameters are bound
+    separately, so the same query with different ids has the same shape.
+    Nested trackers (a test around a request) record to their parent too.
+    """
+
+    __slots__ = ("count", "duration", "shapes", "parent")
+
+    def __init__(self, parent: Optional["StatementStats"] = None):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Dict[str, int] = {}
+        self.parent = parent
+
+    def record(self, statement: str, duration: float):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.duration += duration
+            stats.shapes[statement] = stats.shapes.get(statement, 0) + 1
+            stats = stats.parent
+
+    def repeated(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least ``threshold`` times, most frequent first"""
+        return sorted(
+            ((statement, count) for statement, count in self.shapes.items() if count >= threshold),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+    def report(self) -> str:
+        return "\n".join(
+            f"{count:5d}x {statement}"
+            for statement, count in sorted(self.shapes.items(), key=lambda item: item[1], reverse=True)
+        )
+
+
+_current_stats: "contextvars.ContextVar[Optional[StatementStats]]" = contextvars.ContextVar(
+    "sql_statement_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("onenet_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.get("onenet_query_started")
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start
+    # time so it doesn't stay on the pooled connection
+    conn = exception_context.connection
+    started = conn.info.get("onenet_query_started") if conn is not None else None
+    if started:
+        started.pop()
+
+
+def install():
+    """Attach the cursor listeners to every Engine (idempotent)"""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+            _installed = True
+
+
+@contextmanager
+def track_statements() -> Iterator[StatementStats]:
+    """Count statements executed in this context (and the thread pool calls it spawns)"""
+    install()
+    stats = StatementStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class SqlAccountingMiddleware:
+    """
+    Pure ASGI middleware counting the SQL statements and DB time of each request.
+
+    Responses get ``X-DB-Statements`` and ``Server-Timing: db;dur=<ms>``
+    (statements run while a response body streams are only in the log
+    line). A debug line with ``db_statements``/``db_time_ms`` fields is
+    logged per request, and a warning when a statement shape repeats
+    ``threshold`` times (suspected N+1).
+    """
+
+    def __init__(self, app, threshold: int = SQL_N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_statements() as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"x-db-statements", b"%d" % stats.count),
+                        (b"server-timing", b"db;dur=%.3f" % (stats.duration * 1000)),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                self._log(scope, stats)
+
+    def _log(self, scope, stats: StatementStats):
+        route = getattr(scope.get("route"), "path", None) or scope["path"]
+        fields = {"path": route, "db_statements": stats.count, "db_time_ms": round(stats.duration * 1000, 3)}
+        logger.debug(
+            "%s %s: %s SQL statements in %.1f ms",
+            scope["method"], route, stats.count, stats.duration * 1000, extra=fields,
+        )
+        repeated = stats.repeated(self.threshold)
+        if repeated and log_sampler.allow(route, "SQL-N+1"):
+            statement, count = repeated[0]
+            logger.warning(
+                "Suspected N+1 on %s %s: statement executed %s times: %s",
+                scope["method"], route, count, statement,
+                extra={**fields, "error_code": "SQL-N+1", "repeated_statements": count},
+            )
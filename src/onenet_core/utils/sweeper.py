@@ -0,0 +1,60 @@
+"""Background deletion of expired sessions."""
+import asyncio
+from typing import Optional
+
+from ..database import run_with_app_db, session_from_dependency
+from ..config import SESSION_SWEEP_INTERVAL_SECONDS, SESSION_SWEEP_BATCH_SIZE
+from ..logger import get_logger
+from .session_store import get_session_store
+
+logger = get_logger(__name__)
+
+
+class SessionSweeper:
+    """Periodically purges expired state from the active session store"""
+
+    def __init__(
+        self,
+        app,
+        interval_seconds: int = SESSION_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = SESSION_SWEEP_BATCH_SIZE,
+    ):
+        self.app = app
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    def _sweep(self, db) -> int:
+        deleted = get_session_store().purge_expired(db, self.batch_size)
+        if deleted:
+            logger.info("Session sweeper removed %s expired session(s)", deleted)
+        return deleted
+
+    def sweep_once(self) -> int:
+        with session_from_dependency(self.app) as db:
+            return self._sweep(db)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await run_with_app_db(self.app, self._sweep)
+            except NotImplementedError:
+                logger.warning("Session sweeper stopped: the app's database dependency has not been overridden")
+                return
+            except Exception:
+                logger.exception("Session sweep failed; retrying on the next interval")
+
+    def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
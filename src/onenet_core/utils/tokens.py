@@ -0,0 +1,223 @@
+"""Stateless HMAC-signed session tokens and the in-process revocation list."""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.session import SessionRevocation
+from ..config import (
+    SESSION_TTL_SECONDS,
+    SESSION_TOKEN_SECRET,
+    SESSION_REVOCATION_REFRESH_SECONDS,
+    SESSION_REVOCATION_LOOKBACK_SECONDS,
+)
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+TOKEN_PREFIX = "v1"
+
+_secret = SESSION_TOKEN_SECRET.encode()
+if not _secret:
+    _secret = secrets.token_bytes(32)
+_warned_missing_secret = False
+
+_EPOCH = datetime(1970, 1, 1)
+# Newest user-wide cutoff recorded by this process; tokens are issued after it
+_latest_cutoff_us = 0
+
+
+@dataclass
+class TokenClaims:
+    user_id: int
+    token_id: str
+    issued_at: datetime
+    expires_at: datetime
+    permissions_version: int
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_secret, payload.encode(), hashlib.sha256).digest())
+
+
+def _now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def _from_us(us: int) -> datetime:
+    # Exact: no float round trip
+    return _EPOCH + timedelta(microseconds=us)
+
+
+def encode_session_token(user_id: int, permissions_version: int = 0, ttl_seconds: int = SESSION_TTL_SECONDS) -> str:
+    """Issue a signed token carrying the user id, expiry and permission version"""
+    global _warned_missing_secret
+    if not SESSION_TOKEN_SECRET and not _warned_missing_secret:
+        _warned_missing_secret = True
+        logger.warning(
+            "SESSION_TOKEN_SECRET is not set; tokens are signed with a per-process "
+            "random key and will not validate on other workers or after a restart"
+        )
+    # Microseconds, like revoked_at, and never at or before a cutoff this
+    # process recorded, so a token issued right after a user-wide
+    # revocation (change_password) is not caught by it
+    issued_us = max(_now_us(), _latest_cutoff_us + 1)
+    claims = {
+        "uid": user_id,
+        "jti": secrets.token_urlsafe(12),
+        "iat": issued_us / 1_000_000,
+        "exp": issued_us // 1_000_000 + ttl_seconds,
+        "pv": permissions_version,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{TOKEN_PREFIX}.{payload}.{_sign(payload)}"
+
+
+def decode_session_token(token: Optional[str]) -> Optional[TokenClaims]:
+    """Verify a token's signature and expiry; returns None if it is not valid"""
+    if not token:
+        return None
+    parts = token.split(".")
+    if len(parts) != 3 or parts[0] != TOKEN_PREFIX:
+        return None
+    _, payload, signature = parts
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+        decoded = TokenClaims(
+            user_id=int(claims["uid"]),
+            token_id=str(claims["jti"]),
+            issued_at=_from_us(round(claims["iat"] * 1_000_000)),
+            expires_at=datetime.utcfromtimestamp(claims["exp"]),
+            permissions_version=int(claims.get("pv", 0)),
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+    if decoded.expires_at <= datetime.utcnow():
+        return None
+    return decoded
+
+
+class RevocationList:
+    """
+    In-memory copy of session_revocations.
+
+    The first refresh loads every unexpired row; later ones, at most
+    every refresh_seconds, re-read rows revoked since the previous
+    refresh minus lookback_seconds. Ids or revoked_at values do not
+    become visible in order (a revocation is written inside a longer
+    transaction by change_password), so a high-water mark would skip
+    rows; re-reading the window catches any row committed up to
+    lookback_seconds late. Revocations made on other workers take effect
+    within refresh_seconds; those made by this process apply at once.
+    """
+
+    def __init__(
+        self,
+        refresh_seconds: int = SESSION_REVOCATION_REFRESH_SECONDS,
+        lookback_seconds: int = SESSION_REVOCATION_LOOKBACK_SECONDS,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.lookback_seconds = lookback_seconds
+        self._token_ids: Dict[str, datetime] = {}
+        self._user_cutoffs: Dict[int, datetime] = {}
+        self._last_refresh_started: Optional[datetime] = None
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def refresh(self, db: Session, force: bool = False):
+        now = time.monotonic()
+        if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        started = datetime.utcnow()
+        query = db.query(SessionRevocation)
+        if self._last_refresh_started is None:
+            query = query.filter(SessionRevocation.expires_at > started)
+        else:
+            since = self._last_refresh_started - timedelta(seconds=self.lookback_seconds)
+            query = query.filter(SessionRevocation.revoked_at >= since)
+        rows = query.all()
+        with self._lock:
+            for row in rows:
+                self._apply(row.token_id, row.user_id, row.revoked_at, row.expires_at)
+            self._prune()
+            self._last_refresh_started = started
+            self._refreshed_at = now
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        if claims.token_id in self._token_ids:
+            return True
+        cutoff = self._user_cutoffs.get(claims.user_id)
+        return cutoff is not None and claims.issued_at <= cutoff
+
+    def revoke_token(self, db: Session, claims: TokenClaims):
+        """Revoke a single token (logout)"""
+        self._record(db, SessionRevocation(
+            token_id=claims.token_id,
+            revoked_at=datetime.utcnow(),
+            expires_at=claims.expires_at,
+        ))
+
+    def revoke_user(self, db: Session, user_id: int, commit: bool = True):
+        """Revoke every token issued to user_id so far (deactivation)"""
+        global _latest_cutoff_us
+        now_us = _now_us()
+        _latest_cutoff_us = max(_latest_cutoff_us, now_us)
+        now = _from_us(now_us)
+        self._record(db, SessionRevocation(
+            user_id=user_id,
+            revoked_at=now,
+            expires_at=now + timedelta(seconds=SESSION_TTL_SECONDS),
+        ), commit=commit)
+
+    def clear(self):
+        with self._lock:
+            self._token_ids.clear()
+            self._user_cutoffs.clear()
+            self._last_refresh_started = None
+            self._refreshed_at = None
+
+    def _record(self, db: Session, row: SessionRevocation, commit: bool = True):
+        db.add(row)
+        if commit:
+            db.commit()
+        with self._lock:
+            self._apply(row.token_id, row.user_id, row.revoked_at, row.expires_at)
+
+    def _apply(self, token_id, user_id, revoked_at, expires_at):
+        # Caller must hold the lock
+        if token_id:
+            self._token_ids[token_id] = expires_at
+        if user_id is not None:
+            current = self._user_cutoffs.get(user_id)
+            if current is None or revoked_at > current:
+                self._user_cutoffs[user_id] = revoked_at
+
+    def _prune(self):
+        # Caller must hold the lock; expired tokens fail verification anyway
+        now = datetime.utcnow()
+        for token_id in [t for t, expires_at in self._token_ids.items() if expires_at <= now]:
+            del self._token_ids[token_id]
+        horizon = now - timedelta(seconds=SESSION_TTL_SECONDS)
+        for user_id in [u for u, cutoff in self._user_cutoffs.items() if cutoff <= horizon]:
+            del self._user_cutoffs[user_id]
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,196 @@
+"""Write-behind coalescing of last_login and session last_seen updates."""
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+
+from ..models.user import User
+from ..models.session import Session as SessionModel
+from ..database import run_with_app_db, session_from_dependency
+from ..config import (
+    WRITE_BEHIND_FLUSH_INTERVAL_SECONDS, WRITE_BEHIND_FLUSH_THRESHOLD, WRITE_BEHIND_MAX_ENTRIES
+)
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+_users = User.__table__
+_sessions = SessionModel.__table__
+
+_UPDATE_LAST_LOGIN = (
+    _users.update()
+    .where(_users.c.id == bindparam("_id"))
+    .values(last_login=bindparam("_ts"))
+)
+_UPDATE_LAST_SEEN = (
+    _sessions.update()
+    .where(_sessions.c.session_id == bindparam("_id"))
+    .values(last_seen_at=bindparam("_ts"))
+)
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces timestamp updates in memory and writes them in batches.
+
+    Only the latest timestamp per user / session is kept. Once
+    ``max_entries`` distinct keys are pending, updates for new keys are
+    dropped (and counted) until the next flush. Nothing is buffered while
+    no WriteBehindFlusher is running: record_login() returns False and the
+    caller writes last_login itself.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = WRITE_BEHIND_MAX_ENTRIES,
+        flush_threshold: int = WRITE_BEHIND_FLUSH_THRESHOLD,
+    ):
+        self.max_entries = max_entries
+        self.flush_threshold = flush_threshold
+        self._last_login: Dict[int, datetime] = {}
+        self._last_seen: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._flushers = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._last_login) + len(self._last_seen)
+
+    @property
+    def needs_flush(self) -> bool:
+        return self.pending >= self.flush_threshold
+
+    @property
+    def active(self) -> bool:
+        return self._flushers > 0
+
+    def record_login(self, user_id: int, at: Optional[datetime] = None) -> bool:
+        """Buffer a last_login update; False if it was not buffered and must be written directly"""
+        return self._record(self._last_login, user_id, at)
+
+    def touch_session(self, session_id: str, at: Optional[datetime] = None) -> bool:
+        # last_seen_at is best effort: without a flusher it is simply not tracked
+        return self._record(self._last_seen, session_id, at)
+
+    def _record(self, target: dict, key, at: Optional[datetime]) -> bool:
+        if not self._flushers:
+            return False
+        at = at or datetime.utcnow()
+        with self._lock:
+            if key not in target and self.pending >= self.max_entries:
+                self.dropped += 1
+                return False
+            target[key] = at
+        return True
+
+    def flush(self, db: Session) -> int:
+        """Write everything pending with one executemany UPDATE per table"""
+        with self._lock:
+            last_login, self._last_login = self._last_login, {}
+            last_seen, self._last_seen = self._last_seen, {}
+        if not last_login and not last_seen:
+            return 0
+
+        try:
+            if last_login:
+                db.execute(_UPDATE_LAST_LOGIN, [{"_id": k, "_ts": v} for k, v in last_login.items()])
+            if last_seen:
+                db.execute(_UPDATE_LAST_SEEN, [{"_id": k, "_ts": v} for k, v in last_seen.items()])
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._restore(self._last_login, last_login)
+            self._restore(self._last_seen, last_seen)
+            raise
+
+        written = len(last_login) + len(last_seen)
+        self.flushed += written
+        return written
+
+    def _restore(self, target: dict, entries: dict):
+        # Put a failed batch back; values recorded since the swap are newer and win
+        with self._lock:
+            for key, at in entries.items():
+                target.setdefault(key, at)
+
+    def attach(self):
+        with self._lock:
+            self._flushers += 1
+
+    def detach(self):
+        with self._lock:
+            self._flushers = max(0, self._flushers - 1)
+
+
+write_behind = WriteBehindBuffer()
+
+
+class WriteBehindFlusher:
+    """Flushes a WriteBehindBuffer on an interval, early past the size threshold, and on shutdown"""
+
+    def __init__(
+        self,
+        app,
+        buffer: WriteBehindBuffer = write_behind,
+        interval_seconds: int = WRITE_BEHIND_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.app = app
+        self.buffer = buffer
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._attached = False
+
+    def _detach(self):
+        # Later updates are written directly again
+        if self._attached:
+            self._attached = False
+            self.buffer.detach()
+
+    def flush_once(self) -> int:
+        with session_from_dependency(self.app) as db:
+            return self.buffer.flush(db)
+
+    async def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            await asyncio.sleep(min(1, self.interval_seconds))
+            due = time.monotonic() - last_flush >= self.interval_seconds
+            if not (due or self.buffer.needs_flush):
+                continue
+            last_flush = time.monotonic()
+            try:
+                await run_with_app_db(self.app, self.buffer.flush)
+            except NotImplementedError:
+                logger.warning("Write-behind flusher stopped: the app's database dependency has not been overridden")
+                self._detach()
+                return
+            except Exception:
+                logger.exception("Write-behind flush failed; retrying on the next interval")
+
+    def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            self.buffer.attach()
+            self._attached = True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._detach()
+        try:
+            await run_with_app_db(self.app, self.buffer.flush)
+        except NotImplementedError:
+            pass
+        except Exception:
+            logger.exception("Final write-behind flush failed")
@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from onenet_core.database import Base, SessionLocal, configure_database
+from onenet_core.main import create_app
+from onenet_core.models import Permission, Role, User
+from onenet_core.utils.permissions import permission_registry, sync_effective_permissions
+from onenet_core.utils.role_catalog import role_catalog
+from onenet_core.utils.session_cache import session_cache
+
+PASSWORD = "pw123456"
+ADMIN_PERMISSIONS = ["user:read", "user:create", "user:update", "user:delete", "role:read", "role:create", "role:assign"]
+
+
+@pytest.fixture
+def engine():
+    engine = configure_database("sqlite://")
+    Base.metadata.create_all(engine)
+    session_cache.clear()
+    role_catalog.invalidate()
+    yield engine
+    session_cache.clear()
+    role_catalog.invalidate()
+
+
+@pytest.fixture
+def db(engine):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def seed_users(db, count: int = 0):
+    """Create an admin (root@x.io) and ``count`` regular users"""
+    permissions = [Permission(name=name, category=name.split(":")[0]) for name in ADMIN_PERMISSIONS]
+    admin = Role(name="admin", description="Administrators", permissions=permissions)
+    viewer = Role(name="viewer", description="Read only", permissions=permissions[:1])
+    db.add_all([admin, viewer])
+    db.add(User(email="root@x.io", name="Root", password_hash=PASSWORD, is_active=True, roles=[admin]))
+    for i in range(count):
+        db.add(User(email=f"user{i}@x.io", name=f"User {i}", password_hash=PASSWORD, is_active=True, roles=[viewer]))
+    db.commit()
+    permission_registry.register_all(db)
+    sync_effective_permissions(db)
+    db.commit()
+
+
+@pytest.fixture
+def client(engine):
+    with TestClient(create_app()) as client:
+        yield client
+
+
+def login(client, email: str = "root@x.io", password: str = PASSWORD):
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return response
@@ -0,0 +1,48 @@
+import inspect
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from onenet_core.database import get_async_db
+from onenet_core.dependencies import require_permissions
+from onenet_core.main import create_app
+from onenet_core.routers.auth import get_current_user_profile
+from onenet_core.utils.async_routes import asyncify
+
+from .conftest import login, seed_users
+
+
+def test_dependencies_without_a_session_run_on_the_event_loop():
+    assert inspect.iscoroutinefunction(asyncify(require_permissions(["user:read"])))
+    assert inspect.iscoroutinefunction(asyncify(get_current_user_profile))
+
+
+@pytest.fixture
+def async_client(tmp_path, engine):
+    pytest.importorskip("aiosqlite")
+    path = tmp_path / "async.db"
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    async def override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app = create_app(async_db=True)
+    app.dependency_overrides[get_async_db] = override
+    return path, TestClient(app)
+
+
+def test_async_app_serves_protected_routes(async_client):
+    from onenet_core.database import Base, SessionLocal, configure_database
+
+    path, client = async_client
+    sync_engine = configure_database(f"sqlite:///{path}")
+    Base.metadata.create_all(sync_engine)
+    db = SessionLocal()
+    seed_users(db, count=2)
+    db.close()
+
+    login(client)
+    assert client.get("/auth/me").json()["data"]["email"] == "root@x.io"
+    assert client.get("/users").status_code == 200
@@ -0,0 +1,23 @@
+import logging
+
+from onenet_core.logger import log_sampler, parse_sample_rates
+
+from .conftest import seed_users
+
+
+def test_parse_sample_rates_skips_malformed_entries(caplog):
+    with caplog.at_level(logging.WARNING, logger="onenet_core.sampling"):
+        rates = parse_sample_rates("/auth/me=0.1, AUTH-002=abc,=0.5,broken,PERM-001=2,,X=nan")
+    assert rates == {"/auth/me": 0.1, "PERM-001": 1.0}
+    assert len(caplog.records) == 4
+
+
+def test_unauthenticated_request_is_logged_once(client, db, caplog, monkeypatch):
+    seed_users(db)
+    monkeypatch.setattr(log_sampler, "rates", {})
+    client.cookies.set("session_id", "not-a-session")
+    with caplog.at_level(logging.INFO, logger="onenet_core"):
+        assert client.get("/auth/me").status_code == 401
+    errors = [r for r in caplog.records if getattr(r, "error_code", None) == "AUTH-002"]
+    assert len(errors) == 1
+    assert errors[0].name == "onenet_core.exceptions"
@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+from onenet_core.database import configure_database
+from onenet_core.main import create_app
+from onenet_core.models import Permission
+from onenet_core.utils.permissions import permission_registry
+
+
+def test_startup_registers_every_permission_row(engine, db):
+    db.add(Permission(name="reports:export", category="reports"))
+    db.commit()
+    assert "reports:export" not in permission_registry._bits
+
+    with TestClient(create_app()):
+        assert "reports:export" in permission_registry._bits
+
+
+def test_startup_survives_an_unmigrated_database():
+    configure_database("sqlite://")
+    with TestClient(create_app()) as client:
+        assert client.get("/meta/health").status_code == 200
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from onenet_core.database import (
+    Base, ReplicaSessionLocal, SessionLocal, configure_database, configure_replica, read_your_writes,
+)
+from onenet_core.main import create_app
+from onenet_core.models import User
+from onenet_core.utils.role_catalog import RoleCatalog
+from onenet_core.utils.session_cache import session_cache
+
+from .conftest import login, seed_users
+
+
+@pytest.fixture
+def lagging_replica(tmp_path):
+    """A primary file database and a replica that only changes when snapshot() copies it"""
+    primary_path, replica_path = tmp_path / "primary.db", tmp_path / "replica.db"
+    engine = configure_database(f"sqlite:///{primary_path}")
+    Base.metadata.create_all(engine)
+
+    def snapshot():
+        engine.dispose()
+        with sqlite3.connect(primary_path) as source, sqlite3.connect(replica_path) as target:
+            source.backup(target)
+        configure_replica(f"sqlite:///{replica_path}")
+
+    session_cache.clear()
+    yield snapshot
+    configure_replica(None)
+    read_your_writes.clear()
+    session_cache.clear()
+
+
+def test_revoked_session_is_not_accepted_from_the_replica(lagging_replica):
+    db = SessionLocal()
+    seed_users(db, count=1)
+    admin, victim = TestClient(create_app()), TestClient(create_app())
+    login(admin)
+    login(victim, "user0@x.io")
+    lagging_replica()
+    read_your_writes.clear()
+
+    user_id = db.query(User.id).filter(User.email == "user0@x.io").scalar()
+    assert admin.delete(f"/users/{user_id}").status_code == 200
+    read_your_writes.clear()
+
+    assert victim.get("/auth/me").status_code == 401
+    db.close()
+
+
+def test_role_catalog_does_not_cache_replica_reads_right_after_invalidation(lagging_replica):
+    db = SessionLocal()
+    seed_users(db)
+    lagging_replica()
+    catalog = RoleCatalog(ttl_seconds=30, lag_seconds=5)
+    replica = ReplicaSessionLocal()
+
+    catalog.snapshot(replica)
+    assert catalog._snapshot is not None
+
+    catalog.invalidate()
+    catalog.snapshot(replica)
+    assert catalog._snapshot is None
+
+    catalog.snapshot(db)
+    assert catalog._snapshot is not None
+    replica.close()
+    db.close()
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+
+from onenet_core.models import User
+from onenet_core.utils.search import SqliteFts5Index, UserSearchIndex, get_search_index, install_search_index, set_search_index
+
+pytestmark = pytest.mark.skipif(sqlite3.sqlite_version_info < (3, 34, 0), reason="FTS5 trigram tokenizer needs SQLite 3.34")
+
+NAMES = ["Änne Berg", "JÄN Koch", "jän", "Jänner", "hans Müller", "olga müller", "Anna Smith", "Bob_Jones", "Zoë 100%", "an"]
+TERMS = ["än", "ÄN", "Än", "ä", "mü", "änn", "an", "AN", "a", "müll", "MÜLL", "smith", "SMI", "b_j", "bob_", "0%", "%", "_", "zoë", "ber", "x.io", "user"]
+
+
+@pytest.fixture
+def fts_db(db):
+    for i, name in enumerate(NAMES):
+        db.add(User(email=f"user{i}@x.io", name=name, password_hash="x", is_active=True))
+    db.commit()
+    SqliteFts5Index().install(db.connection())
+    db.commit()
+    yield db
+    set_search_index(None)
+
+
+def _ids(db, index, term):
+    pattern = f"%{term.lower()}%"
+    return sorted(user_id for (user_id,) in db.query(User.id).filter(index.clause(pattern)))
+
+
+@pytest.mark.parametrize("term", TERMS)
+def test_fts5_matches_the_ilike_scan(fts_db, term):
+    assert _ids(fts_db, SqliteFts5Index(), term) == _ids(fts_db, UserSearchIndex(), term)
+
+
+def test_fts5_index_follows_updates(fts_db):
+    user = fts_db.query(User).filter(User.name == "Anna Smith").one()
+    user.name = "Anna Jones"
+    fts_db.commit()
+    assert _ids(fts_db, SqliteFts5Index(), "smith") == []
+    assert _ids(fts_db, SqliteFts5Index(), "jones") == _ids(fts_db, UserSearchIndex(), "jones")
+
+
+def test_install_search_index_picks_fts5_for_sqlite(db):
+    try:
+        assert install_search_index(db).name == "fts5"
+        assert get_search_index().name == "fts5"
+    finally:
+        set_search_index(None)
@@ -0,0 +1,96 @@
+import pytest
+
+from onenet_core.models import User
+
+from .conftest import PASSWORD, login, seed_users
+
+
+def _login_as(client, email):
+    other = client.__class__(client.app)
+    login(other, email)
+    assert other.get("/auth/me").status_code == 200
+    return other
+
+
+def test_update_user_deactivation_revokes_sessions(client, db):
+    seed_users(db, count=1)
+    login(client)
+    victim = _login_as(client, "user0@x.io")
+    user_id = db.query(User.id).filter(User.email == "user0@x.io").scalar()
+
+    assert client.put(f"/users/{user_id}", json={"is_active": False}).status_code == 200
+    assert victim.get("/auth/me").status_code == 401
+
+
+def test_update_user_dropping_roles_revokes_sessions(client, db):
+    seed_users(db, count=1)
+    login(client)
+    victim = _login_as(client, "user0@x.io")
+    user_id = db.query(User.id).filter(User.email == "user0@x.io").scalar()
+
+    assert client.put(f"/users/{user_id}", json={"roles": []}).status_code == 200
+    assert victim.get("/auth/me").status_code == 401
+
+
+def test_update_user_without_revocation_keeps_sessions(client, db):
+    seed_users(db, count=1)
+    login(client)
+    victim = _login_as(client, "user0@x.io")
+    user_id = db.query(User.id).filter(User.email == "user0@x.io").scalar()
+
+    assert client.put(f"/users/{user_id}", json={"name": "Renamed", "roles": ["viewer", "admin"]}).status_code == 200
+    assert victim.get("/auth/me").status_code == 200
+
+
+def test_change_password_is_atomic(client, db, monkeypatch):
+    seed_users(db)
+    login(client)
+    old_cookie = client.cookies.get("session_id")
+
+    from onenet_core.routers import auth
+
+    def failing_create(session, user, commit=True):
+        raise RuntimeError("session store unavailable")
+
+    monkeypatch.setattr(auth, "create_session_for_user", failing_create)
+    with pytest.raises(RuntimeError):
+        client.post("/auth/change-password", json={"current_password": PASSWORD, "new_password": "newpass123"})
+
+    db.expire_all()
+    assert db.query(User.password_hash).filter(User.email == "root@x.io").scalar() == PASSWORD
+    client.cookies.set("session_id", old_cookie)
+    assert client.get("/auth/me").status_code == 200
+
+
+def test_change_password_rotates_the_session(client, db):
+    seed_users(db)
+    login(client)
+    old_cookie = client.cookies.get("session_id")
+
+    response = client.post("/auth/change-password", json={"current_password": PASSWORD, "new_password": "newpass123"})
+    assert response.status_code == 200
+    assert client.get("/auth/me").status_code == 200
+
+    client.cookies.set("session_id", old_cookie)
+    assert client.get("/auth/me").status_code == 401
+
+
+@pytest.mark.parametrize("path", ["/users/{id}", "/users/{id}/roles/viewer"])
+def test_revoking_endpoints_are_atomic(client, db, monkeypatch, path):
+    seed_users(db, count=1)
+    login(client)
+    user_id = db.query(User.id).filter(User.email == "user0@x.io").scalar()
+
+    from onenet_core.routers import users
+
+    def failing_revoke(session, user_id, commit=True):
+        raise RuntimeError("session store unavailable")
+
+    monkeypatch.setattr(users, "revoke_user_sessions", failing_revoke)
+    with pytest.raises(RuntimeError):
+        client.delete(path.format(id=user_id))
+
+    db.expire_all()
+    found = db.get(User, user_id)
+    assert found.is_active
+    assert [r.name for r in found.roles] == ["viewer"]
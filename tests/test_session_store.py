@@ -0,0 +1,25 @@
+import pytest
+
+from onenet_core.models import User
+from onenet_core.utils.session_cache import session_cache
+from onenet_core.utils.session_store import SessionStore, SqlSessionStore, get_session_store
+
+from .conftest import login, seed_users
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_inactive_user_is_rejected_by_the_sql_store(client, db):
+    assert isinstance(get_session_store(), SqlSessionStore)
+    seed_users(db)
+    login(client)
+
+    # Deactivated behind the API's back: no revocation, only the flag
+    db.query(User).filter(User.email == "root@x.io").update({"is_active": False})
+    db.commit()
+    session_cache.clear()
+
+    assert client.get("/auth/me").status_code == 401
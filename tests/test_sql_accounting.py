@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from onenet_core.utils.sql_accounting import track_statements
+
+
+def test_failed_statement_does_not_leak_its_start_time(engine):
+    with engine.connect() as conn:
+        with track_statements() as stats:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+            conn.execute(text("SELECT 1"))
+        assert conn.info.get("onenet_query_started") == []
+    assert stats.count == 1
+
+
+def test_repeated_statement_shapes_are_reported(engine):
+    with engine.connect() as conn, track_statements() as stats:
+        for i in range(5):
+            conn.execute(text("SELECT :value"), {"value": i})
+    assert stats.repeated(5) == [("SELECT ?", 5)]
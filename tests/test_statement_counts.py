@@ -0,0 +1,38 @@
+import pytest
+
+from onenet_core.testing import assert_max_statements
+from onenet_core.utils.session_cache import session_cache
+
+from .conftest import login, seed_users
+
+
+def test_auth_me_loads_session_graph_in_one_statement(client, db):
+    seed_users(db)
+    login(client)
+    session_cache.clear()
+
+    with assert_max_statements(1):
+        response = client.get("/auth/me")
+    assert response.status_code == 200
+    assert response.json()["data"]["email"] == "root@x.io"
+
+
+def test_auth_me_cached_session_runs_no_statements(client, db):
+    seed_users(db)
+    login(client)
+    client.get("/auth/me")
+
+    with assert_max_statements(0):
+        assert client.get("/auth/me").status_code == 200
+
+
+@pytest.mark.parametrize("page_size", [20, 100])
+def test_list_users_statement_count_is_independent_of_page_size(client, db, page_size):
+    seed_users(db, count=120)
+    login(client)
+    client.get("/auth/me")
+
+    with assert_max_statements(3):
+        response = client.get("/users", params={"page_size": page_size})
+    assert response.status_code == 200
+    assert len(response.json()["data"]["items"]) == page_size
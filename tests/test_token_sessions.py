@@ -0,0 +1,76 @@
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+
+from onenet_core.models import User
+from onenet_core.models.session import SessionRevocation
+from onenet_core.utils import tokens
+from onenet_core.utils.session_store import TokenSessionStore, get_session_store, set_session_store
+from onenet_core.utils.tokens import revocation_list
+
+from .conftest import login, seed_users
+
+
+@pytest.fixture
+def token_store():
+    previous = get_session_store()
+    revocation_list.clear()
+    set_session_store(TokenSessionStore())
+    yield
+    set_session_store(previous)
+    revocation_list.clear()
+
+
+def test_role_change_refreshes_token_principal(token_store, client, db):
+    seed_users(db, count=1)
+    login(client)
+    user_client = client.__class__(client.app)
+    login(user_client, "user0@x.io")
+    assert user_client.get("/auth/me").status_code == 200
+
+    user_id = db.query(User.id).filter(User.email == "user0@x.io").scalar()
+    assert client.post(f"/users/{user_id}/roles", json={"role_name": "admin"}).status_code == 200
+
+    response = user_client.get("/auth/me")
+    assert response.status_code == 200
+    assert "role:read" in response.json()["data"]["permissions"]
+
+
+def test_missing_secret_warning_is_logged_once(monkeypatch, caplog):
+    monkeypatch.setattr(tokens, "_warned_missing_secret", False)
+    with caplog.at_level(logging.WARNING, logger="onenet_core.utils.tokens"):
+        tokens.encode_session_token(1)
+        tokens.encode_session_token(2)
+    assert len([r for r in caplog.records if "SESSION_TOKEN_SECRET" in r.getMessage()]) == 1
+
+
+def test_change_password_keeps_the_new_token(token_store, client, db):
+    seed_users(db)
+    login(client)
+    passwords = ["pw123456", "newpass123"]
+    for i in range(40):
+        old_cookie = client.cookies.get("session_id")
+        response = client.post(
+            "/auth/change-password",
+            json={"current_password": passwords[i % 2], "new_password": passwords[(i + 1) % 2]},
+        )
+        assert response.status_code == 200
+        assert client.get("/auth/me").status_code == 200
+
+    client.cookies.set("session_id", old_cookie)
+    assert client.get("/auth/me").status_code == 401
+
+
+def test_refresh_sees_revocations_committed_late(token_store, db):
+    claims = tokens.decode_session_token(tokens.encode_session_token(7))
+    now = datetime.utcnow()
+    db.add(SessionRevocation(id=5, token_id="other", revoked_at=now, expires_at=now + timedelta(hours=1)))
+    db.commit()
+    revocation_list.refresh(db, force=True)
+
+    # Took a lower id and revoked_at, but committed after the refresh
+    db.add(SessionRevocation(id=2, user_id=7, revoked_at=now, expires_at=now + timedelta(hours=1)))
+    db.commit()
+    revocation_list.refresh(db, force=True)
+    assert revocation_list.is_revoked(claims)
@@ -0,0 +1,44 @@
+from onenet_core.models import User
+from onenet_core.routers import users as users_router
+
+from .conftest import login, seed_users
+
+
+def test_csv_blank_is_active_keeps_the_default(client, db):
+    seed_users(db)
+    login(client)
+    body = "email,name,password,is_active\na@x.io,A,password1,\nb@x.io,B,password1,false\n"
+
+    response = client.post("/users/import", params={"format": "csv"}, content=body)
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["created"] == 2
+
+    active = dict(db.query(User.email, User.is_active).filter(User.email.in_(["a@x.io", "b@x.io"])))
+    assert active == {"a@x.io": True, "b@x.io": False}
+
+
+def test_email_taken_after_the_existence_check_is_reported_per_row(client, db, monkeypatch):
+    seed_users(db)
+    login(client)
+
+    # Simulate a concurrent import inserting b@x.io between the check and the insert
+    original = users_router._insert_users
+
+    def insert_with_race(session, rows, role_ids, now):
+        if len(rows) > 1:
+            original(session, [row for row in rows if row[1].email == "b@x.io"], role_ids, now)
+            session.commit()
+        return original(session, rows, role_ids, now)
+
+    monkeypatch.setattr(users_router, "_insert_users", insert_with_race)
+    body = "\n".join(
+        '{"email": "%s@x.io", "name": "N", "password": "password1"}' % name for name in ("a", "b", "c")
+    )
+
+    response = client.post("/users/import", content=body)
+    assert response.status_code == 200, response.text
+    results = response.json()["data"]["results"]
+    assert [(r["email"], r["status"]) for r in results] == [
+        ("a@x.io", "created"), ("b@x.io", "error"), ("c@x.io", "created"),
+    ]
+    assert results[1]["error_code"] == "USER-002"
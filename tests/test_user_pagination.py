@@ -0,0 +1,50 @@
+import base64
+import json
+
+import pytest
+
+from onenet_core.utils.pagination import encode_cursor
+
+from .conftest import login, seed_users
+
+
+def _cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).rstrip(b"=").decode()
+
+
+def test_cursor_pages_cover_every_user(client, db):
+    seed_users(db, count=5)
+    login(client)
+    seen, cursor = [], None
+    while True:
+        params = {"pagination": "cursor", "page_size": 2, "sort_by": "created_at"}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/users", params=params).json()["data"]
+        seen += [item["id"] for item in data["items"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 6
+
+
+@pytest.mark.parametrize("sort_by, cursor", [
+    ("created_at", _cursor({"s": "created_at", "o": "asc", "id": 1})),
+    ("created_at", _cursor({"s": "created_at", "o": "asc", "v": "yesterday", "id": 1})),
+    ("name", _cursor({"s": "name", "o": "asc", "v": {"a": 1}, "id": 1})),
+    ("name", _cursor({"s": "name", "o": "asc", "v": [1], "id": 1})),
+    ("name", encode_cursor("email", "asc", "a@x.io", 1)),
+    ("name", "not-a-cursor"),
+])
+def test_bad_cursor_is_a_validation_error(client, db, sort_by, cursor):
+    seed_users(db)
+    login(client)
+    response = client.get("/users", params={"pagination": "cursor", "sort_by": sort_by, "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["error_code"] == "VAL-001"
+
+
+def test_unknown_pagination_mode_is_rejected(client, db):
+    seed_users(db)
+    login(client)
+    assert client.get("/users", params={"pagination": "keyset"}).status_code == 422
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from onenet_core.main import create_app
+from onenet_core.models import User
+from onenet_core.utils.write_behind import WriteBehindBuffer, write_behind
+
+from .conftest import login, seed_users
+
+
+class FailingSession:
+    def __init__(self):
+        self.rolled_back = False
+
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def test_failed_flush_keeps_entries_and_newer_values():
+    buffer = WriteBehindBuffer()
+    buffer.attach()
+    old, new = datetime(2024, 1, 1), datetime(2024, 1, 2)
+    buffer.record_login(1, old)
+    buffer.touch_session("abc", old)
+
+    session = FailingSession()
+    original_execute = session.execute
+
+    def execute_and_race(*args, **kwargs):
+        # A newer update arrives while the failing flush is in flight
+        buffer.record_login(1, new)
+        original_execute(*args, **kwargs)
+
+    session.execute = execute_and_race
+    with pytest.raises(RuntimeError):
+        buffer.flush(session)
+
+    assert session.rolled_back
+    assert buffer.pending == 2
+    assert buffer._last_login[1] == new
+    assert buffer._last_seen["abc"] == old
+
+
+def test_nothing_is_buffered_without_a_flusher():
+    buffer = WriteBehindBuffer()
+    assert not buffer.record_login(1)
+    assert not buffer.touch_session("abc")
+    assert buffer.pending == 0
+
+
+def test_login_writes_last_login_directly_without_lifespan(engine, db):
+    seed_users(db)
+    client = TestClient(create_app())  # no lifespan, so no flusher
+    assert not write_behind.active
+    login(client)
+
+    db.expire_all()
+    assert db.query(User).filter(User.email == "root@x.io").one().last_login is not None
+
+
+def test_login_is_buffered_while_the_flusher_runs(client, db):
+    seed_users(db)
+    assert write_behind.active
+    login(client)
+
+    db.expire_all()
+    assert db.query(User).filter(User.email == "root@x.io").one().last_login is None
+    assert write_behind.pending >= 1